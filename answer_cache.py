@@ -0,0 +1,179 @@
+# answer_cache.py
+# Cache of RAG answers per document: an exact tier keyed by (document content hash, normalized question)
+# and a semantic tier that matches paraphrases by cosine similarity of question embeddings.
+
+import os
+import re
+import time
+
+from sqlite_cache import SQLiteCache, default_cache_path, shared_instance
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", default_cache_path("answer_cache.db"))
+# Seconds an answer stays valid (0 disables the cache)
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Minimum cosine similarity for a paraphrased question to reuse an answer
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial rewordings match exactly."""
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", (question or "").lower())).strip()
+
+
+def _cosine(a, b) -> float:
+    import numpy as np
+    a, b = np.asarray(a, dtype="float32"), np.asarray(b, dtype="float32")
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / denom if denom else 0.0
+
+
+class AnswerCache(SQLiteCache):
+    """SQLite-backed answer cache shared by every session (answers are per document content, not per user)."""
+
+    LABEL = "Answer cache"
+    COUNTERS = ("exact_hits", "semantic_hits", "misses")
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS answers (
+            doc_hash TEXT NOT NULL,
+            model_id TEXT NOT NULL,
+            question_norm TEXT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            embedding BLOB,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (doc_hash, model_id, question_norm)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_answers_expiry ON answers(expires_at);",
+    )
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+                 similarity: float = ANSWER_CACHE_SIMILARITY):
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        super().__init__(path, enabled=ttl_seconds > 0)
+
+    # --- Lookup ---
+
+    def get_exact(self, doc_hash: str, model_id: str, question: str):
+        if not self.enabled:
+            return None
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT answer FROM answers WHERE doc_hash=? AND model_id=? AND question_norm=? AND expires_at > ?;",
+                (doc_hash, model_id, normalize_question(question), time.time())
+            ).fetchone()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Answer cache read failed: {e}")
+            return None
+        if row:
+            self._count("exact_hits")
+            return row[0]
+        return None
+
+    def get_semantic(self, doc_hash: str, model_id: str, question_vector):
+        """Best cached answer for the document whose question embedding clears the similarity threshold."""
+        if not self.enabled or question_vector is None:
+            return None
+        import numpy as np
+
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT answer, embedding FROM answers "
+                "WHERE doc_hash=? AND model_id=? AND expires_at > ? AND embedding IS NOT NULL;",
+                (doc_hash, model_id, time.time())
+            ).fetchall()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Answer cache read failed: {e}")
+            return None
+
+        best_answer, best_score = None, self.similarity
+        for answer, blob in rows:
+            score = _cosine(question_vector, np.frombuffer(blob, dtype="float32"))
+            if score >= best_score:
+                best_answer, best_score = answer, score
+        if best_answer is not None:
+            self._count("semantic_hits")
+        else:
+            self._count("misses")
+        return best_answer
+
+    def lookup(self, doc_hash: str, model_id: str, question: str, embed=None):
+        """
+        Exact tier first, then the semantic tier. embed(question) -> vector is only called on an exact miss.
+        Returns (answer or None, question vector or None) so a miss can store without re-embedding.
+        """
+        answer = self.get_exact(doc_hash, model_id, question)
+        if answer is not None or not self.enabled:
+            return answer, None
+        vector = None
+        if embed is not None:
+            try:
+                vector = embed(question)
+            except Exception as e:
+                print(f"⚠️ Answer cache could not embed question: {e}")
+        if vector is None:
+            self._count("misses")
+            return None, None
+        return self.get_semantic(doc_hash, model_id, vector), vector
+
+    # --- Updates ---
+
+    def put(self, doc_hash: str, model_id: str, question: str, answer: str, question_vector=None):
+        if not self.enabled or not answer:
+            return
+
+        now = time.time()
+        blob = None
+        if question_vector is not None:
+            import numpy as np
+            blob = np.asarray(question_vector, dtype="float32").tobytes()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(doc_hash, model_id, question_norm, question, answer, embedding, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+                (doc_hash, model_id, normalize_question(question), question, answer, blob, now, now + self.ttl_seconds)
+            )
+            # Opportunistic expiry sweep
+            conn.execute("DELETE FROM answers WHERE expires_at <= ?;", (now,))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Answer cache write failed: {e}")
+
+    def invalidate(self, doc_hash: str) -> int:
+        """Drop every cached answer for a document's contents (called when it is reprocessed)."""
+        if not self.enabled:
+            return 0
+        try:
+            conn = self._connect()
+            deleted = conn.execute("DELETE FROM answers WHERE doc_hash=?;", (doc_hash,)).rowcount
+            conn.commit()
+            conn.close()
+            return deleted
+        except Exception as e:
+            print(f"⚠️ Answer cache invalidation failed: {e}")
+            return 0
+
+    def clear(self):
+        if not self.enabled:
+            return
+        conn = self._connect()
+        conn.execute("DELETE FROM answers;")
+        conn.commit()
+        conn.close()
+
+    def _disk_stats(self, conn) -> dict:
+        entries = conn.execute("SELECT COUNT(*) FROM answers WHERE expires_at > ?;", (time.time(),)).fetchone()[0]
+        return {"entries": entries}
+
+
+get_answer_cache = shared_instance(AnswerCache)
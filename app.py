@@ -31,6 +31,7 @@ from styling import inject_css
 from auth_ui import show_auth_forms, show_forgot_password_form
 from dashboard_ui import show_dashboard
 from session_state import init_session_state
+from warmup import start_warmup
 
 # --------------------------
 # SETUP
@@ -49,6 +50,7 @@ st.set_page_config(
 init_master_db()
 init_session_state()
 inject_css()
+start_warmup() # Once per server process; preloads models in the background
 
 
 # --------------------------
@@ -0,0 +1,86 @@
+# bench_import.py
+# Import-time budget for models.py: importing it must stay cheap and must not pull in the ML stack.
+#
+#   python bench_import.py                 # 5 cold imports, 0.5s budget
+#   python bench_import.py --runs 10 --budget 0.3
+#   python bench_import.py --detail        # slowest modules from python -X importtime
+#
+# Exits non-zero if the median import time exceeds the budget or a heavy module is imported.
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+HEAVY_MODULES = [
+    "torch", "transformers", "sentence_transformers", "langchain_core", "langchain_community",
+    "langchain_huggingface", "langchain_classic", "faiss", "nltk", "huggingface_hub", "streamlit",
+]
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import models
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once() -> dict:
+    """Import models in a fresh interpreter and return {seconds, loaded}."""
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int = 15):
+    """(cumulative microseconds, module) for the slowest imports under python -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import models"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), module.rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of models.py.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_BUDGET_SECONDS", "0.5")))
+    parser.add_argument("--detail", action="store_true")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    timings = [r["seconds"] for r in runs]
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    median = statistics.median(timings)
+
+    print(f"⏱️ import models: median {median * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms over {args.runs} runs")
+    print(f"   budget: {args.budget * 1000:.0f} ms")
+    if loaded:
+        print(f"   heavy modules imported: {', '.join(loaded)}")
+
+    if args.detail:
+        print("\nSlowest imports (cumulative):")
+        for cumulative_us, module in slowest_imports():
+            print(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+    passed = median <= args.budget and not loaded
+    print(f"{'✅ PASS' if passed else '❌ FAIL'}")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
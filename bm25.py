@@ -0,0 +1,137 @@
+# bm25.py
+# Per-document BM25 inverted indexes (built once per document) and reciprocal rank fusion
+# with the FAISS dense ranking. Query cost is proportional to the postings of the query terms.
+
+import re
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Standard RRF damping constant
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"[a-z0-9$]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\n\s*\n")
+
+# Longest first; a suffix is only stripped if at least 3 characters remain
+_SUFFIXES = ("ities", "ings", "ions", "ing", "ion", "ity", "ies", "ied", "es", "ed", "ly", "s", "e")
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "by", "with", "at", "as", "is", "are",
+    "be", "this", "that", "it", "its", "from", "what", "which", "who", "how", "does", "do", "there",
+    "any", "about", "me", "my", "i", "you", "your", "can", "tell",
+}
+
+
+def stem(token: str) -> str:
+    """Very light suffix stripping so 'terminate', 'terminated' and 'termination' share a term."""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> list:
+    return [stem(t) for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def split_sentences(text: str) -> list:
+    """(start, end, sentence) for every non-empty sentence, with offsets into text."""
+    sentences, start = [], 0
+    for match in _SENTENCE_RE.finditer(text):
+        if text[start:match.start()].strip():
+            sentences.append((start, match.start(), text[start:match.start()].strip()))
+        start = match.end()
+    if text[start:].strip():
+        sentences.append((start, len(text), text[start:].strip()))
+    return sentences
+
+
+class BM25Index:
+    """Inverted index over a fixed list of passages with Okapi BM25 scoring."""
+
+    def __init__(self, passages):
+        self.passages = list(passages)
+        self.postings = {}  # term -> [(passage index, term frequency)]
+        self.lengths = []
+        for i, passage in enumerate(self.passages):
+            counts = {}
+            for term in tokenize(passage):
+                counts[term] = counts.get(term, 0) + 1
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((i, tf))
+        n = len(self.passages)
+        self.avg_length = (sum(self.lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.passages)
+
+    def scores(self, query: str) -> dict:
+        """{passage index: BM25 score} for passages containing at least one query term."""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / (self.avg_length or 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, k: int = 5) -> list:
+        """Top-k (passage index, score), best first."""
+        ranked = sorted(self.scores(query).items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+
+class SentenceIndex(BM25Index):
+    """BM25 over a document's sentences, keeping each sentence's character offsets."""
+
+    def __init__(self, text: str):
+        spans = split_sentences(text)
+        self.offsets = [(start, end) for start, end, _ in spans]
+        super().__init__(sentence for _, _, sentence in spans)
+
+    def top_sentences(self, query: str, k: int = 3, document_order: bool = False) -> list:
+        hits = [i for i, _ in self.search(query, k)]
+        if document_order:
+            hits.sort()
+        return [self.passages[i] for i in hits]
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K) -> list:
+    """Fuse several best-first lists of ids into one best-first list of (id, fused score)."""
+    fused = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+
+
+# Sentence indexes by document text hash, so every caller shares the one built at processing time
+_SENTENCE_INDEXES = OrderedDict()
+_SENTENCE_INDEXES_MAX = 32
+_SENTENCE_LOCK = threading.Lock()
+
+
+def sentence_index_for(text: str) -> SentenceIndex:
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _SENTENCE_LOCK:
+        index = _SENTENCE_INDEXES.get(key)
+        if index is not None:
+            _SENTENCE_INDEXES.move_to_end(key)
+            return index
+    index = SentenceIndex(text)
+    with _SENTENCE_LOCK:
+        _SENTENCE_INDEXES[key] = index
+        while len(_SENTENCE_INDEXES) > _SENTENCE_INDEXES_MAX:
+            _SENTENCE_INDEXES.popitem(last=False)
+    return index
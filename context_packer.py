@@ -0,0 +1,108 @@
+# context_packer.py
+# Fits the RAG prompt into the generator's encoder window, counting tokens with its own tokenizer.
+# The question always goes in; retrieved chunks are added best-ranked first and recent chat turns
+# newest first, so whatever doesn't fit is the lowest-ranked chunk or the oldest turn.
+
+import os
+
+# Share of the space left after the template and question that history may claim
+# (chunks can use whatever history doesn't need, and vice versa)
+RAG_HISTORY_SHARE = float(os.getenv("RAG_HISTORY_SHARE", "0.25"))
+# A chunk is trimmed to fit only if at least this many of its tokens would survive; otherwise dropped
+RAG_MIN_CHUNK_TOKENS = int(os.getenv("RAG_MIN_CHUNK_TOKENS", "48"))
+# Tokens held back for separators, which tokenize slightly differently once joined
+RAG_PACK_MARGIN = 8
+# The question may use at most this share of the window (longer questions keep their beginning)
+RAG_MAX_QUESTION_SHARE = 0.5
+
+CHUNK_SEPARATOR = "\n\n"
+HISTORY_SEPARATOR = "\n"
+
+
+def encoder_limit(tokenizer, default: int = 512) -> int:
+    """The tokenizer's model_max_length, or default when it's unset (some report a huge sentinel)."""
+    limit = getattr(tokenizer, "model_max_length", None)
+    if not limit or limit > 100_000:
+        return default
+    return int(limit)
+
+
+def _lengths(tokenizer, texts) -> list:
+    if not texts:
+        return []
+    return [len(ids) for ids in tokenizer(list(texts), add_special_tokens=False)["input_ids"]]
+
+
+def _truncate(tokenizer, text: str, max_tokens: int) -> str:
+    ids = tokenizer(text, add_special_tokens=False)["input_ids"][:max(0, max_tokens)]
+    return tokenizer.decode(ids, skip_special_tokens=True).strip()
+
+
+def pack_prompt(tokenizer, template: str, question: str, chunks, history=(), max_tokens: int = None):
+    """
+    Build template.format(context=..., question=...) within max_tokens (default: the encoder limit).
+    chunks: retrieved passages, best first. history: (question, answer) turns, oldest first.
+    Returns (prompt, report) where report counts the tokens packed and what was dropped or trimmed.
+    """
+    limit = max_tokens or encoder_limit(tokenizer)
+    chunks, history = list(chunks), list(history)
+
+    fixed = len(tokenizer(template.format(context="", question=""))["input_ids"]) + RAG_PACK_MARGIN
+    question_line = f"User: {question.strip()}"
+    question_tokens = _lengths(tokenizer, [question_line])[0]
+    max_question = int(limit * RAG_MAX_QUESTION_SHARE)
+    if question_tokens > max_question:
+        question_line = _truncate(tokenizer, question_line, max_question)
+        question_tokens = max_question
+
+    available = max(0, limit - fixed - question_tokens)
+    separator_tokens = max(_lengths(tokenizer, [CHUNK_SEPARATOR])[0], 1)
+    turns = [f"User: {q}\nAI: {a}" for q, a in history]
+    turn_lengths = _lengths(tokenizer, turns)
+    chunk_lengths = _lengths(tokenizer, chunks)
+
+    # History gets at most its share unless the chunks leave room to spare
+    history_wanted = sum(turn_lengths) + len(turns) * separator_tokens
+    history_reserved = min(history_wanted, int(available * RAG_HISTORY_SHARE))
+
+    # Chunks, best ranked first
+    packed_chunks, trimmed, used = [], 0, 0
+    chunk_budget = available - history_reserved
+    for chunk, length in zip(chunks, chunk_lengths):
+        separator = separator_tokens if packed_chunks else 0
+        room = chunk_budget - used - separator
+        if length <= room:
+            packed_chunks.append(chunk)
+            used += separator + length
+            continue
+        if room >= RAG_MIN_CHUNK_TOKENS:
+            packed_chunks.append(_truncate(tokenizer, chunk, room))
+            used += separator + room
+            trimmed += 1
+        break
+    context_tokens = used
+
+    # History, newest turn first, into whatever is left
+    packed_turns, history_tokens = [], 0
+    history_budget = available - context_tokens
+    for turn, length in zip(reversed(turns), reversed(turn_lengths)):
+        if history_tokens + length + separator_tokens > history_budget:
+            break
+        packed_turns.insert(0, turn)
+        history_tokens += length + separator_tokens
+
+    question_block = HISTORY_SEPARATOR.join(packed_turns + [question_line])
+    prompt = template.format(context=CHUNK_SEPARATOR.join(packed_chunks), question=question_block)
+    report = {
+        "prompt_tokens": len(tokenizer(prompt)["input_ids"]),
+        "limit": limit,
+        "question_tokens": question_tokens,
+        "context_tokens": context_tokens,
+        "history_tokens": history_tokens,
+        "chunks_used": len(packed_chunks),
+        "chunks_trimmed": trimmed,
+        "chunks_dropped": len(chunks) - len(packed_chunks),
+        "history_turns_used": len(packed_turns),
+        "history_turns_dropped": len(turns) - len(packed_turns),
+    }
+    return prompt, report
@@ -45,10 +45,16 @@ def show_dashboard():
         st.caption(f"Using: {st.session_state.simplification_model}")
         st.markdown("---")
 
+        with st.expander("Model Status"):
+            from warmup import model_status, format_status
+            for row in model_status():
+                icon = {"ready": "🟢", "loading": "🟡", "queued": "⚪", "failed": "🔴"}.get(row["state"], "⚫")
+                st.caption(f"{icon} {format_status(row)}")
+
         if st.session_state.get("is_admin", False):
             with st.expander("Admin Panel"):
                 
-                admin_options = ["Hide Admin", "User Management", "Reports", "Tenant DB Inspector"]
+                admin_options = ["Hide Admin", "User Management", "Reports", "Tenant DB Inspector", "Model Status"]
                 
                 admin_selection_radio = st.radio(
                     "admin_nav", options=admin_options,
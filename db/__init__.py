@@ -8,6 +8,12 @@ from .tenant_db import (
     init_tenant_db,
     get_tenant_user_id,
     save_document,  # <-- This now correctly refers to the new 9-argument function
+    get_document,
+    save_document_chunks,
+    get_document_chunks,
+    get_chunk_ids_for_documents,
+    save_suggested_answer,
+    get_suggested_answers,
     save_chat_history,
     load_chat_history,
     get_glossary_terms,
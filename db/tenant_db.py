@@ -109,6 +109,12 @@ def init_tenant_db(db_path: str):
         );
     """)
 
+    # Chunks of every document in the tenant-wide vector index (id = vector id)
+    _ensure_document_chunks(conn)
+
+    # Answers to the Chat Support suggestions, precomputed after processing
+    _ensure_suggested_answers(conn)
+
     # Glossary table
     c.execute("""
         CREATE TABLE IF NOT EXISTS glossary (
@@ -197,6 +203,134 @@ def save_document(db_path: str, user_id: int, file_name: str, title: str, text:
     return doc_id
 # --- *** END MODIFICATION *** ---
 
+# --- Tenant-wide Vector Index Metadata ---
+
+def _ensure_document_chunks(conn):
+    """Create the document_chunks table (tenant DBs created before it existed get it on first use)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS document_chunks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_id INTEGER NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            FOREIGN KEY (document_id) REFERENCES documents(id),
+            UNIQUE(document_id, chunk_index)
+        );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_document_chunks_doc ON document_chunks(document_id);")
+
+def save_document_chunks(db_path: str, document_id: int, chunks: list) -> list:
+    """
+    Replace a document's chunks with (chunk_index, start_offset, end_offset, text) tuples.
+    Returns the new chunk ids in the same order (these are the vector ids in the tenant index).
+    """
+    conn = _connect(db_path)
+    try:
+        _ensure_document_chunks(conn)
+        c = conn.cursor()
+        c.execute("DELETE FROM document_chunks WHERE document_id=?;", (document_id,))
+        ids = []
+        for chunk_index, start_offset, end_offset, text in chunks:
+            c.execute("""
+                INSERT INTO document_chunks (document_id, chunk_index, start_offset, end_offset, text)
+                VALUES (?, ?, ?, ?, ?);
+            """, (document_id, chunk_index, start_offset, end_offset, text))
+            ids.append(c.lastrowid)
+        conn.commit()
+        return ids
+    finally:
+        conn.close()
+
+def get_document_chunks(db_path: str, chunk_ids: list) -> dict:
+    """Chunk rows by id: {id: {document_id, chunk_index, start_offset, end_offset, text}}."""
+    if not chunk_ids:
+        return {}
+    conn = _connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        _ensure_document_chunks(conn)
+        placeholders = ",".join("?" * len(chunk_ids))
+        rows = conn.execute(
+            f"SELECT * FROM document_chunks WHERE id IN ({placeholders});", [int(i) for i in chunk_ids]
+        ).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+    finally:
+        conn.close()
+
+def get_chunk_ids_for_documents(db_path: str, document_ids: list) -> list:
+    """All chunk (vector) ids belonging to the given documents."""
+    if not document_ids:
+        return []
+    conn = _connect(db_path)
+    try:
+        _ensure_document_chunks(conn)
+        placeholders = ",".join("?" * len(document_ids))
+        rows = conn.execute(
+            f"SELECT id FROM document_chunks WHERE document_id IN ({placeholders});", [int(d) for d in document_ids]
+        ).fetchall()
+        return [row[0] for row in rows]
+    finally:
+        conn.close()
+
+# --- Precomputed Suggestion Answers ---
+
+def _ensure_suggested_answers(conn):
+    """Create the suggested_answers table (tenant DBs created before it existed get it on first use)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS suggested_answers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (document_id) REFERENCES documents(id),
+            UNIQUE(document_id, question)
+        );
+    """)
+
+def save_suggested_answer(db_path: str, document_id: int, question: str, answer: str):
+    """Upsert the precomputed answer to one suggested question for a document."""
+    conn = _connect(db_path)
+    try:
+        _ensure_suggested_answers(conn)
+        conn.execute("""
+            INSERT INTO suggested_answers (document_id, question, answer, created_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(document_id, question) DO UPDATE SET
+                answer=excluded.answer,
+                created_at=excluded.created_at;
+        """, (document_id, question, answer, datetime.now()))
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_suggested_answers(db_path: str, document_id: int) -> dict:
+    """Precomputed answers for a document: {question: answer}."""
+    conn = _connect(db_path)
+    try:
+        _ensure_suggested_answers(conn)
+        rows = conn.execute(
+            "SELECT question, answer FROM suggested_answers WHERE document_id=?;", (document_id,)
+        ).fetchall()
+        return {question: answer for question, answer in rows}
+    finally:
+        conn.close()
+
+def get_document(db_path: str, document_id: int, user_id: int = None) -> dict:
+    """Return one document row as a dict (optionally only if owned by user_id), or None."""
+    conn = _connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if user_id is None:
+            row = conn.execute("SELECT * FROM documents WHERE id=?;", (document_id,)).fetchone()
+        else:
+            row = conn.execute("SELECT * FROM documents WHERE id=? AND user_id=?;", (document_id, user_id)).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
 
 def save_chat_history(db_path: str, document_id: int, user_id: int, history: list):
     """Upsert chat transcript for a (document_id, user_id) pair."""
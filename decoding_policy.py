@@ -0,0 +1,113 @@
+# decoding_policy.py
+# Picks a decoding strategy per simplification batch from a per-document latency budget.
+
+import os
+import time
+from collections import namedtuple
+
+# cost_factor is relative to 4-beam search; min_len_factor relaxes the chunk's min_new_tokens
+DecodingStrategy = namedtuple("DecodingStrategy", ["name", "num_beams", "min_len_factor", "cost_factor"])
+
+BEAM4 = DecodingStrategy("beam4", 4, 1.0, 1.0)
+BEAM2 = DecodingStrategy("beam2", 2, 0.75, 0.6)
+GREEDY = DecodingStrategy("greedy", 1, 0.5, 0.35)
+GREEDY_RELAXED = DecodingStrategy("greedy-relaxed", 1, 0.0, 0.25)
+
+# Most expensive (best) first
+STRATEGIES = [BEAM4, BEAM2, GREEDY, GREEDY_RELAXED]
+
+# Seconds of latency budget per document; None = no budget (always full beam search)
+DECODING_PROFILES = {
+    "fast": float(os.getenv("DECODING_FAST_BUDGET_SECONDS", "45")),
+    "full": None,
+}
+
+# Starting guess for 4-beam CPU cost per generated token; refined from observed batches
+DEFAULT_SECONDS_PER_TOKEN = float(os.getenv("DECODING_SECONDS_PER_TOKEN", "0.02"))
+
+
+def estimated_output_tokens(jobs) -> int:
+    """Expected generated tokens for a set of simplification jobs (midpoint of each length window)."""
+    return sum((job["min_len"] + job["max_len"]) // 2 for job in jobs)
+
+
+class DecodingPolicy:
+    """Chooses a strategy per batch so the whole document fits its latency budget, and records every choice."""
+
+    def __init__(self, latency_budget: float = None, profile: str = "full"):
+        self.profile = profile
+        self.latency_budget = latency_budget
+        self.seconds_per_token = DEFAULT_SECONDS_PER_TOKEN
+        self.decisions = []  # one entry per chunk: {chunk_index, strategy, num_beams, min_len_factor}
+        self._start = time.time()
+        self._committed_seconds = 0.0
+
+    @classmethod
+    def for_profile(cls, profile: str = "full", latency_budget: float = None):
+        """Build a policy from a named profile; an explicit latency_budget overrides the profile's."""
+        if latency_budget is None:
+            latency_budget = DECODING_PROFILES.get(profile)
+        return cls(latency_budget=latency_budget, profile=profile)
+
+    def _time_used(self) -> float:
+        return max(time.time() - self._start, self._committed_seconds)
+
+    def choose(self, batch, remaining_tokens: int, parallelism: int = 1) -> DecodingStrategy:
+        """
+        Pick the best strategy whose estimated cost for this batch and everything after it
+        still fits the remaining budget. remaining_tokens includes this batch.
+        """
+        strategy = BEAM4
+        if self.latency_budget is not None:
+            time_left = self.latency_budget - self._time_used()
+            for candidate in STRATEGIES:
+                estimate = remaining_tokens * self.seconds_per_token * candidate.cost_factor / max(1, parallelism)
+                strategy = candidate
+                if estimate <= time_left:
+                    break
+
+            # Reserve this batch's share so planning ahead (process pool) stays honest
+            self._committed_seconds = self._time_used() + (
+                estimated_output_tokens(batch) * self.seconds_per_token * strategy.cost_factor / max(1, parallelism)
+            )
+
+        for job in batch:
+            self.decisions.append({
+                "chunk_index": job["index"],
+                "strategy": strategy.name,
+                "num_beams": strategy.num_beams,
+                "min_len_factor": strategy.min_len_factor,
+            })
+        return strategy
+
+    def observe(self, batch, strategy: DecodingStrategy, elapsed: float):
+        """Refine the per-token cost estimate from a finished batch."""
+        tokens = estimated_output_tokens(batch)
+        if tokens and elapsed > 0:
+            observed = elapsed / (tokens * strategy.cost_factor)
+            self.seconds_per_token = 0.7 * self.seconds_per_token + 0.3 * observed
+        self._committed_seconds = time.time() - self._start
+
+    def apply(self, batch, strategy: DecodingStrategy):
+        """Copy of the batch carrying the strategy, with min_new_tokens relaxed to match."""
+        relaxed = []
+        for job in batch:
+            job = dict(job)
+            job["min_len"] = int(job["min_len"] * strategy.min_len_factor)
+            job["num_beams"] = strategy.num_beams
+            job["decoding"] = strategy.name
+            relaxed.append(job)
+        return relaxed
+
+    def summary(self) -> dict:
+        """Counts per strategy plus the raw per-chunk decisions."""
+        counts = {}
+        for decision in self.decisions:
+            counts[decision["strategy"]] = counts.get(decision["strategy"], 0) + 1
+        return {
+            "profile": self.profile,
+            "latency_budget": self.latency_budget,
+            "elapsed_seconds": round(time.time() - self._start, 2),
+            "strategy_counts": counts,
+            "decisions": sorted(self.decisions, key=lambda d: d["chunk_index"]),
+        }
@@ -0,0 +1,306 @@
+# embedding_cache.py
+# Content-addressed cache of chunk embeddings: float16 rows appended to a memory-mapped file
+# per embedding model, with a SQLite hash -> row index.
+
+import os
+import re
+import hashlib
+import time
+from contextlib import contextmanager
+
+from sqlite_cache import SQLiteCache, default_cache_path, shared_instance
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", default_cache_path("embedding_cache"))
+# Size bound for the vector files (0 disables the cache)
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+# Compaction keeps the most recently used rows up to this fraction of the cap
+EMBEDDING_CACHE_COMPACT_TO = 0.8
+
+
+def make_embedding_key(text: str, model_id: str) -> str:
+    """Hash of the whitespace-normalized chunk and the embedding model id."""
+    normalized = re.sub(r"\s+", " ", text or "").strip()
+    return hashlib.sha256(f"{model_id}\x1f{normalized}".encode("utf-8")).hexdigest()
+
+
+def _safe_name(model_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id) or "default"
+
+
+@contextmanager
+def _file_lock(path: str, shared: bool = False):
+    """
+    Advisory lock on path held across processes (app replicas share the cache directory).
+    Shared for readers, exclusive for appends and compaction; exclusive only on Windows.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10 s; keep waiting
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EmbeddingCache(SQLiteCache):
+    """
+    Append-only float16 vector store shared by every document and tenant.
+    Rows are only ever appended; compact() rewrites the file keeping the most recently used rows.
+    Appends and compaction hold an exclusive lock on the cache directory across processes, lookups a
+    shared one, so a row number is never handed out twice or read against a rewritten file.
+    """
+
+    LABEL = "Embedding cache"
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            key TEXT PRIMARY KEY,
+            model_id TEXT NOT NULL,
+            row INTEGER NOT NULL,
+            dim INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_embeddings_model_access ON embeddings(model_id, last_access);",
+    )
+
+    def __init__(self, cache_dir: str = EMBEDDING_CACHE_DIR, max_mb: float = EMBEDDING_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._maps = {}  # model_id -> ((inode, rows), np.memmap)
+        super().__init__(os.path.join(cache_dir, "index.db"), enabled=self.max_bytes > 0)
+
+    # --- Storage ---
+
+    def _locked(self, shared: bool = False):
+        return _file_lock(os.path.join(self.cache_dir, "vectors.lock"), shared)
+
+    def _vector_path(self, model_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{_safe_name(model_id)}.f16")
+
+    def _memmap(self, model_id: str, dim: int):
+        """
+        Read-only memmap over every row currently in the file (remapped when the file has grown or
+        another process has compacted it into a new file).
+        """
+        import numpy as np
+
+        path = self._vector_path(model_id)
+        row_bytes = dim * 2
+        st = os.stat(path) if os.path.exists(path) else None
+        rows = st.st_size // row_bytes if st else 0
+        version = (st.st_ino if st else None, rows)
+        cached = self._maps.get(model_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        mapped = np.memmap(path, dtype=np.float16, mode="r", shape=(rows, dim)) if rows else None
+        self._maps[model_id] = (version, mapped)
+        return mapped
+
+    # --- Public API ---
+
+    def get_many(self, texts, model_id: str) -> list:
+        """One float32 vector (list) per text, or None where the text isn't cached."""
+        results = [None] * len(texts)
+        if not self.enabled or not texts:
+            return results
+
+        keys = [make_embedding_key(t, model_id) for t in texts]
+        try:
+            with self._lock, self._locked(shared=True):
+                conn = self._connect()
+                found = {}
+                unique = list(dict.fromkeys(keys))
+                for start in range(0, len(unique), 500):
+                    batch = unique[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    found.update({
+                        key: (row, dim) for key, row, dim in conn.execute(
+                            f"SELECT key, row, dim FROM embeddings WHERE key IN ({placeholders});", batch
+                        )
+                    })
+                if found:
+                    now = time.time()
+                    conn.executemany(
+                        "UPDATE embeddings SET last_access=? WHERE key=?;", [(now, k) for k in found]
+                    )
+                    conn.commit()
+                conn.close()
+
+                for i, key in enumerate(keys):
+                    if key not in found:
+                        continue
+                    row, dim = found[key]
+                    mapped = self._memmap(model_id, dim)
+                    if mapped is not None and row < mapped.shape[0]:
+                        results[i] = mapped[row].astype("float32").tolist()
+        except Exception as e:
+            print(f"⚠️ Embedding cache read failed: {e}")
+            return [None] * len(texts)
+
+        hits = sum(1 for r in results if r is not None)
+        self._count("hits", hits)
+        self._count("misses", len(texts) - hits)
+        return results
+
+    def put_many(self, texts, vectors, model_id: str):
+        """Append vectors for texts that aren't cached yet, compacting if the file passes the cap."""
+        if not self.enabled or not texts:
+            return
+        import numpy as np
+
+        try:
+            with self._lock, self._locked():
+                conn = self._connect()
+                pending = {}
+                for text, vector in zip(texts, vectors):
+                    key = make_embedding_key(text, model_id)
+                    if key not in pending:
+                        pending[key] = vector
+                existing = set()
+                keys = list(pending)
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    existing.update(k for (k,) in conn.execute(
+                        f"SELECT key FROM embeddings WHERE key IN ({placeholders});", batch
+                    ))
+                new = [(k, v) for k, v in pending.items() if k not in existing]
+                if not new:
+                    conn.close()
+                    return
+
+                matrix = np.asarray([v for _, v in new], dtype=np.float16)
+                dim = matrix.shape[1]
+                path = self._vector_path(model_id)
+                with open(path, "ab") as f:
+                    # Row numbers come from the file size under the exclusive lock; a partial row
+                    # left by an interrupted write is cut off first so rows stay aligned
+                    first_row = os.fstat(f.fileno()).st_size // (dim * 2)
+                    f.truncate(first_row * dim * 2)
+                    f.write(matrix.tobytes())
+                    f.flush()
+                    try:
+                        now = time.time()
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO embeddings (key, model_id, row, dim, last_access) "
+                            "VALUES (?, ?, ?, ?, ?);",
+                            [(key, model_id, first_row + i, dim, now) for i, (key, _) in enumerate(new)]
+                        )
+                        conn.commit()
+                    except Exception:
+                        # Index not updated: drop the rows nothing points at
+                        conn.rollback()
+                        f.truncate(first_row * dim * 2)
+                        raise
+                    finally:
+                        conn.close()
+                    oversized = f.tell() > self.max_bytes
+
+            if oversized:
+                self.compact(model_id)
+        except Exception as e:
+            print(f"⚠️ Embedding cache write failed: {e}")
+
+    def compact(self, model_id: str = None) -> int:
+        """
+        Rewrite vector files keeping only indexed rows, most recently used first, up to the
+        compaction target; returns the number of rows kept. All models when model_id is None.
+        """
+        import numpy as np
+
+        if not self.enabled:
+            return 0
+        with self._lock, self._locked():
+            conn = self._connect()
+            model_ids = [model_id] if model_id else [m for (m,) in conn.execute(
+                "SELECT DISTINCT model_id FROM embeddings;"
+            )]
+            kept_total = 0
+            for mid in model_ids:
+                rows = conn.execute(
+                    "SELECT key, row, dim FROM embeddings WHERE model_id=? ORDER BY last_access DESC;", (mid,)
+                ).fetchall()
+                if not rows:
+                    continue
+                dim = rows[0][2]
+                budget_rows = int(self.max_bytes * EMBEDDING_CACHE_COMPACT_TO) // (dim * 2)
+                mapped = self._memmap(mid, dim)
+                keep = [(key, row) for key, row, _ in rows[:budget_rows]
+                        if mapped is not None and row < mapped.shape[0]]
+                keep_keys = {key for key, _ in keep}
+                drop = [key for key, _, _ in rows if key not in keep_keys]
+
+                path = self._vector_path(mid)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    for start in range(0, len(keep), 4096):
+                        block = keep[start:start + 4096]
+                        f.write(np.asarray(mapped[[row for _, row in block]], dtype=np.float16).tobytes())
+
+                # New row numbers and the new file go live together: the index update is committed only
+                # once the file is in place (and rolled back if replacing it fails)
+                conn.executemany(
+                    "UPDATE embeddings SET row=? WHERE key=?;", [(i, key) for i, (key, _) in enumerate(keep)]
+                )
+                conn.executemany("DELETE FROM embeddings WHERE key=?;", [(key,) for key in drop])
+                self._maps.pop(mid, None)
+                mapped = None
+                try:
+                    os.replace(tmp_path, path)
+                except Exception:
+                    conn.rollback()
+                    raise
+                conn.commit()
+                kept_total += len(keep)
+                print(f"🧹 Compacted embedding cache for {mid}: kept {len(keep)}, dropped {len(drop)}")
+            conn.close()
+            return kept_total
+
+    def clear(self):
+        if not self.enabled:
+            return
+        with self._lock, self._locked():
+            conn = self._connect()
+            model_ids = [m for (m,) in conn.execute("SELECT DISTINCT model_id FROM embeddings;")]
+            conn.execute("DELETE FROM embeddings;")
+            conn.commit()
+            conn.close()
+            self._maps.clear()
+            for mid in model_ids:
+                path = self._vector_path(mid)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _disk_stats(self, conn) -> dict:
+        entries = conn.execute("SELECT COUNT(*) FROM embeddings;").fetchone()[0]
+        size_bytes = sum(
+            os.path.getsize(os.path.join(self.cache_dir, name))
+            for name in os.listdir(self.cache_dir) if name.endswith(".f16")
+        )
+        return {
+            "entries": entries,
+            "size_mb": round(size_bytes / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+        }
+
+
+get_embedding_cache = shared_instance(EmbeddingCache)
@@ -0,0 +1,185 @@
+# embedding_service.py
+# Process-wide MiniLM embedding service: requests from every session are coalesced into
+# micro-batches on one worker thread and answered through futures.
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+# Texts per forward pass
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# How long the worker waits for more requests before running a partial batch
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "10"))
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+_ADAPTER_CLASS = None
+
+
+class _Request:
+    def __init__(self, texts, cache=True):
+        self.texts = list(texts)
+        self.cache = cache
+        self.future = Future()
+
+
+class EmbeddingService:
+    """Embeds texts for all callers through one shared model, batching concurrent requests together."""
+
+    def __init__(self, batch_size: int = EMBED_BATCH_SIZE, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.requests = 0
+
+    # --- Public API ---
+
+    def submit(self, texts, cache: bool = True) -> Future:
+        """
+        Queue texts for embedding; the future resolves to one vector (list of floats) per text.
+        With cache, vectors are looked up in (and added to) the chunk embedding cache.
+        """
+        request = _Request(texts, cache)
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    def embed_documents(self, texts) -> list:
+        return self.submit(texts).result()
+
+    def embed_query(self, text: str) -> list:
+        # Queries are rarely repeated verbatim; keep them out of the chunk cache
+        return self.submit([text], cache=False).result()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "avg_batch_size": round(self.texts / self.batches, 1) if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+    # --- Worker ---
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        """Block for one request, then keep taking requests until the batch is full or the wait expires."""
+        pending = [self._queue.get()]
+        count = len(pending[0].texts)
+        deadline = time.time() + self.max_wait
+        while count < self.batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            pending.append(request)
+            count += len(request.texts)
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [t for request in pending for t in request.texts]
+            cacheable = [c for request in pending for c in [request.cache] * len(request.texts)]
+            try:
+                vectors = self._embed(texts, cacheable)
+            except Exception as e:
+                for request in pending:
+                    if not request.future.cancelled():
+                        request.future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.requests += len(pending)
+                self.texts += len(texts)
+            offset = 0
+            for request in pending:
+                if not request.future.cancelled():
+                    request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+    def _embed(self, texts, cacheable):
+        """Vectors for texts, serving cacheable ones from the embedding cache where possible."""
+        import models
+        from embedding_cache import get_embedding_cache
+
+        model_id = models.embedding_model_id()
+        cache = get_embedding_cache()
+        cached_positions = [i for i, c in enumerate(cacheable) if c]
+        vectors = [None] * len(texts)
+        for i, vector in zip(cached_positions, cache.get_many([texts[i] for i in cached_positions], model_id)):
+            vectors[i] = vector
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            from model_server import get_model_client
+            # Same embed_documents interface whether the model is local or on the model server
+            model = get_model_client() or models.get_embedding_model()
+            # One large document can exceed the batch on its own; encode it in batch-sized slices
+            for start in range(0, len(missing), self.batch_size):
+                positions = missing[start:start + self.batch_size]
+                for i, vector in zip(positions, model.embed_documents([texts[i] for i in positions])):
+                    vectors[i] = vector
+                with self._lock:
+                    self.batches += 1
+
+            to_store = [i for i in missing if cacheable[i]]
+            if to_store:
+                cache.put_many([texts[i] for i in to_store], [vectors[i] for i in to_store], model_id)
+        return vectors
+
+    # --- LangChain ---
+
+    def langchain_embeddings(self):
+        """LangChain Embeddings adapter over this service (for FAISS indexing and retrieval queries)."""
+        return _adapter_class()(self)
+
+
+def _adapter_class():
+    """Build the adapter on first use so importing this module doesn't import LangChain."""
+    global _ADAPTER_CLASS
+    if _ADAPTER_CLASS is not None:
+        return _ADAPTER_CLASS
+    from langchain_core.embeddings import Embeddings
+
+    class ServiceEmbeddings(Embeddings):
+        def __init__(self, service):
+            self.service = service
+
+        def embed_documents(self, texts):
+            return self.service.embed_documents(texts)
+
+        def embed_query(self, text):
+            return self.service.embed_query(text)
+
+    _ADAPTER_CLASS = ServiceEmbeddings
+    return _ADAPTER_CLASS
+
+
+def get_embedding_service() -> EmbeddingService:
+    """The process-wide service (the model itself lives in the model registry)."""
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                _SERVICE = EmbeddingService()
+    return _SERVICE
@@ -0,0 +1,207 @@
+# inference_scheduler.py
+# Process-wide owner of the FLAN-T5 RAG generator: prompts from every session go into one priority
+# queue, a single worker thread coalesces them into padded batches and answers through futures.
+
+import os
+import time
+import queue
+import itertools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Prompts per generate() call
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "8"))
+# How long the worker waits for more requests before running a partial batch
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "15"))
+
+# Lower runs first; background work (suggestion precomputation) only fills gaps
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+_local = threading.local()
+
+
+def current_priority() -> int:
+    """Priority of requests submitted from this thread right now."""
+    return getattr(_local, "priority", PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Requests submitted from this thread inside the block queue behind interactive ones."""
+    previous = current_priority()
+    _local.priority = PRIORITY_BACKGROUND
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+class _Request:
+    def __init__(self, prompt, generate_kwargs, priority, streamer=None):
+        self.prompt = prompt
+        self.generate_kwargs = generate_kwargs
+        self.priority = priority
+        self.streamer = streamer
+        self.future = Future()
+
+    @property
+    def batch_key(self):
+        """Requests can share a generate() call only with identical generation settings."""
+        return tuple(sorted(self.generate_kwargs.items()))
+
+
+class InferenceScheduler:
+    """Runs every RAG generation on one thread, batching concurrent prompts together."""
+
+    def __init__(self, batch_size: int = INFERENCE_BATCH_SIZE, max_wait_ms: float = INFERENCE_MAX_WAIT_MS):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._worker = None
+        self._remote = None  # threads waiting on the model server, so the worker keeps batching
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.streamed = 0
+        self.busy_seconds = 0.0
+
+    # --- Public API ---
+
+    def submit(self, prompt: str, priority: int = None, streamer=None, **generate_kwargs) -> Future:
+        """
+        Queue a prompt; the future resolves to the generated text.
+        With a streamer (e.g. TextIteratorStreamer) the prompt runs on its own so tokens can be pushed to it.
+        """
+        if priority is None:
+            priority = current_priority()
+        request = _Request(prompt, generate_kwargs, priority, streamer)
+        self._ensure_worker()
+        self._queue.put((priority, next(self._sequence), request))
+        return request.future
+
+    def generate(self, prompt: str, **generate_kwargs) -> str:
+        return self.submit(prompt, **generate_kwargs).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            batched = self.requests - self.streamed
+            batch_runs = self.batches - self.streamed
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "streamed": self.streamed,
+                "avg_batch_size": round(batched / batch_runs, 1) if batch_runs else 0.0,
+                "busy_seconds": round(self.busy_seconds, 1),
+                "queued": self._queue.qsize(),
+            }
+
+    # --- Worker ---
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        """
+        Block for the most urgent request, then gather compatible ones until the batch is full or the
+        wait expires. Streamed requests always run alone; incompatible requests go back in the queue.
+        """
+        first = self._queue.get()[2]
+        if first.streamer is not None:
+            return [first]
+
+        pending, deferred = [first], []
+        deadline = time.time() + self.max_wait
+        while len(pending) < self.batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            request = item[2]
+            if request.streamer is None and request.batch_key == first.batch_key:
+                pending.append(request)
+            else:
+                deferred.append(item)
+        for item in deferred:
+            self._queue.put(item)
+        return pending
+
+    def _run(self):
+        from model_server import get_model_client, MODEL_SERVER_POOL_SIZE
+
+        while True:
+            pending = [r for r in self._collect() if r.future.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+            if pending[0].streamer is None and get_model_client() is not None:
+                # The server does the generating; waiting on it here would stall the next batch
+                if self._remote is None:
+                    self._remote = ThreadPoolExecutor(MODEL_SERVER_POOL_SIZE, thread_name_prefix="inference-remote")
+                self._remote.submit(self._complete, pending)
+            else:
+                self._complete(pending)
+
+    def _complete(self, pending):
+        """Generate one batch and resolve its futures."""
+        start = time.time()
+        try:
+            results = self._generate(pending)
+        except Exception as e:
+            for request in pending:
+                if request.streamer is not None:
+                    request.streamer.end()
+                request.future.set_exception(e)
+            return
+
+        with self._lock:
+            self.requests += len(pending)
+            self.batches += 1
+            if pending[0].streamer is not None:
+                self.streamed += 1
+            self.busy_seconds += time.time() - start
+        for request, text in zip(pending, results):
+            request.future.set_result(text)
+
+    def _generate(self, pending):
+        """Generated text per request, in order (one padded generate() call for the whole batch)."""
+        import models
+        from model_server import get_model_client
+
+        prompts = [request.prompt for request in pending]
+        client = get_model_client()
+        if client is not None and pending[0].streamer is None:
+            # The model server's own scheduler batches these with other replicas' prompts
+            priorities = [request.priority for request in pending]
+            return client.generate(prompts, priorities=priorities, **pending[0].generate_kwargs)
+
+        pipe = models.get_rag_pipeline()
+        if isinstance(pipe, str):
+            raise ValueError(pipe)
+        kwargs = dict(pending[0].generate_kwargs)
+        if pending[0].streamer is not None:
+            kwargs["streamer"] = pending[0].streamer
+        outputs = pipe(prompts, batch_size=len(prompts), **kwargs)
+        return [
+            (output[0] if isinstance(output, list) else output).get("generated_text", "")
+            for output in outputs
+        ]
+
+
+def get_inference_scheduler() -> InferenceScheduler:
+    """The process-wide scheduler (the generator itself lives in the model registry)."""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = InferenceScheduler()
+    return _SCHEDULER
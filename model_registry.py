@@ -0,0 +1,303 @@
+# model_registry.py
+# Process-wide registry of loaded seq2seq checkpoints: each checkpoint is loaded once,
+# shared by every pipeline built on it, and evicted LRU-first under a memory budget.
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# 0 = no budget (never evict for size)
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+# 0 = never unload idle models
+MODEL_IDLE_TIMEOUT_SECONDS = float(os.getenv("MODEL_IDLE_TIMEOUT_SECONDS", "0"))
+# First retry delay after a failed load; doubles per consecutive failure up to the max
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "30"))
+MODEL_LOAD_RETRY_MAX_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_MAX_SECONDS", "600"))
+
+
+class ModelLoadError(RuntimeError):
+    """A checkpoint failed to load (possibly on an earlier attempt still inside its retry backoff)."""
+
+
+def _tensor_bytes(value) -> int:
+    """Bytes held by a tensor, or by the tensors inside a (packed-params) tuple."""
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v) for v in value)
+    if hasattr(value, "numel") and hasattr(value, "element_size"):
+        return value.numel() * value.element_size()
+    return 0
+
+
+def estimate_model_bytes(model) -> int:
+    """Approximate resident size of a loaded model."""
+    try:
+        return sum(_tensor_bytes(v) for v in model.state_dict().values())
+    except Exception:
+        pass
+    # ONNX Runtime models hold their weights in the exported graph files
+    save_dir = getattr(model, "model_save_dir", None)
+    if save_dir and os.path.isdir(str(save_dir)):
+        return directory_bytes(str(save_dir), (".onnx", ".onnx_data"))
+    return 0
+
+
+def directory_bytes(path: str, extensions=(".bin", ".safetensors", ".onnx", ".pt")) -> int:
+    """Size of the weight files under a model directory (used to make room before a load)."""
+    total = 0
+    if not path or not os.path.isdir(path):
+        return 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            if name.endswith(extensions):
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+    return total
+
+
+class _Entry:
+    def __init__(self, model, tokenizer, backend, size_bytes):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.backend = backend
+        self.size_bytes = size_bytes
+        self.pipelines = {}
+        self.loaded_at = time.time()
+        self.last_used = time.time()
+
+
+class _InFlight:
+    """One in-progress load that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+        self.progress = 0.0
+        self.stage = "starting"
+        self.started_at = time.time()
+
+
+class _Failure:
+    def __init__(self, error, attempts):
+        self.error = error
+        self.attempts = attempts
+        self.failed_at = time.time()
+        delay = MODEL_LOAD_RETRY_SECONDS * (2 ** (attempts - 1))
+        self.retry_at = self.failed_at + min(delay, MODEL_LOAD_RETRY_MAX_SECONDS)
+
+
+class ModelRegistry:
+    """Loads each checkpoint once, shares it between pipelines, and enforces the memory budget."""
+
+    def __init__(self, memory_budget_mb: float = MODEL_MEMORY_BUDGET_MB,
+                 idle_timeout_seconds: float = MODEL_IDLE_TIMEOUT_SECONDS):
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._entries = OrderedDict()  # checkpoint key -> _Entry, least recently used first
+        self._inflight = {}  # checkpoint key -> _InFlight
+        self._failures = {}  # checkpoint key -> _Failure
+        self._lock = threading.RLock()
+        self._reaper = None
+
+    # --- Lookup ---
+
+    def peek(self, key: str):
+        """Return the loaded entry for key without loading or touching LRU order (or None)."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def _touch(self, key: str):
+        entry = self._entries[key]
+        entry.last_used = time.time()
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_model(self, key: str, loader, expected_bytes: int = 0):
+        """
+        Return the entry for a checkpoint, calling loader() -> (model, tokenizer, backend) if needed.
+        Concurrent callers for the same key share a single load (single-flight); a failed load
+        is remembered and re-raised as ModelLoadError until its retry backoff expires.
+        expected_bytes (e.g. from directory_bytes) lets the registry make room before loading.
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._touch(key)
+
+            failure = self._failures.get(key)
+            if failure is not None and time.time() < failure.retry_at:
+                wait = failure.retry_at - time.time()
+                raise ModelLoadError(f"{key} failed to load (retry in {wait:.0f}s): {failure.error}")
+
+            flight = self._inflight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _InFlight()
+                self._inflight[key] = flight
+
+        if not is_leader:
+            # Someone else is already loading this checkpoint: wait for their result
+            flight.done.wait()
+            if flight.error is not None:
+                raise ModelLoadError(f"{key} failed to load: {flight.error}")
+            with self._lock:
+                if key in self._entries:
+                    return self._touch(key)
+            return flight.entry
+
+        try:
+            if expected_bytes:
+                self._evict_for(expected_bytes)
+
+            model, tokenizer, backend = loader()
+            entry = _Entry(model, tokenizer, backend, estimate_model_bytes(model) or expected_bytes)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self._failures.pop(key, None)
+                print(f"📦 Registered {key} (~{entry.size_bytes / (1024 * 1024):.0f} MB, {backend})")
+                self._enforce_budget(keep=key)
+            flight.entry = entry
+        except Exception as e:
+            with self._lock:
+                previous = self._failures.get(key)
+                failure = _Failure(e, previous.attempts + 1 if previous else 1)
+                self._failures[key] = failure
+            print(f"❌ Failed to load {key} (attempt {failure.attempts}, "
+                  f"retry in {failure.retry_at - failure.failed_at:.0f}s): {e}")
+            flight.error = e
+            raise ModelLoadError(f"{key} failed to load: {e}") from e
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+        self._ensure_reaper()
+        return entry
+
+    def is_loading(self, key: str) -> bool:
+        with self._lock:
+            return key in self._inflight
+
+    def progress_callback(self, key: str):
+        """A progress(fraction, stage) function a loader can call while key is loading."""
+        def _report(progress: float, stage: str):
+            with self._lock:
+                flight = self._inflight.get(key)
+                if flight is not None:
+                    flight.progress = max(0.0, min(1.0, progress))
+                    flight.stage = stage
+        return _report
+
+    def status(self, key: str) -> dict:
+        """Readiness of one checkpoint: ready, loading (with progress), failed or not_loaded."""
+        with self._lock:
+            if key in self._entries:
+                entry = self._entries[key]
+                return {"state": "ready", "progress": 1.0, "stage": "ready",
+                        "size_mb": round(entry.size_bytes / (1024 * 1024), 1)}
+            if key in self._inflight:
+                flight = self._inflight[key]
+                return {"state": "loading", "progress": flight.progress, "stage": flight.stage,
+                        "elapsed_seconds": round(time.time() - flight.started_at, 1)}
+            if key in self._failures:
+                failure = self._failures[key]
+                return {"state": "failed", "progress": 0.0, "stage": "failed", "error": str(failure.error),
+                        "retry_in_seconds": max(0, round(failure.retry_at - time.time()))}
+            return {"state": "not_loaded", "progress": 0.0, "stage": "not loaded"}
+
+    def clear_failure(self, key: str):
+        """Forget a cached load failure so the next call retries immediately."""
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def get_pipeline(self, key: str, pipeline_name: str, loader, builder, expected_bytes: int = 0):
+        """
+        Return a named pipeline over a shared checkpoint, building it once with
+        builder(model, tokenizer, backend).
+        """
+        entry = self.get_model(key, loader, expected_bytes)
+        with self._lock:
+            if pipeline_name not in entry.pipelines:
+                entry.pipelines[pipeline_name] = builder(entry.model, entry.tokenizer, entry.backend)
+            return entry.pipelines[pipeline_name]
+
+    # --- Eviction ---
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.size_bytes for e in self._entries.values())
+
+    def unload(self, key: str) -> bool:
+        """Drop a checkpoint (callers still holding its pipeline keep it alive until they finish)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        print(f"♻️ Unloaded {key} (~{entry.size_bytes / (1024 * 1024):.0f} MB)")
+        entry.pipelines.clear()
+        entry.model = None
+        return True
+
+    def _enforce_budget(self, keep: str = None):
+        if not self.memory_budget_bytes:
+            return
+        while self.resident_bytes() > self.memory_budget_bytes:
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                break
+            self.unload(victim)
+
+    def _evict_for(self, incoming_bytes: int):
+        """Unload LRU checkpoints until incoming_bytes would fit the budget."""
+        if not self.memory_budget_bytes:
+            return
+        with self._lock:
+            while self._entries and self.resident_bytes() + incoming_bytes > self.memory_budget_bytes:
+                self.unload(next(iter(self._entries)))
+
+    def unload_idle(self) -> list:
+        """Unload every checkpoint unused for longer than the idle timeout."""
+        if not self.idle_timeout_seconds:
+            return []
+        cutoff = time.time() - self.idle_timeout_seconds
+        with self._lock:
+            idle = [k for k, e in self._entries.items() if e.last_used < cutoff]
+        for key in idle:
+            self.unload(key)
+        return idle
+
+    def _ensure_reaper(self):
+        if not self.idle_timeout_seconds or (self._reaper and self._reaper.is_alive()):
+            return
+
+        def _reap():
+            while True:
+                time.sleep(max(5.0, self.idle_timeout_seconds / 4))
+                try:
+                    self.unload_idle()
+                except Exception as e:
+                    print(f"⚠️ Idle model reaper failed: {e}")
+
+        self._reaper = threading.Thread(target=_reap, name="model-idle-reaper", daemon=True)
+        self._reaper.start()
+
+    def stats(self) -> list:
+        """One row per loaded checkpoint, most recently used last."""
+        with self._lock:
+            now = time.time()
+            return [
+                {
+                    "key": key,
+                    "backend": e.backend,
+                    "size_mb": round(e.size_bytes / (1024 * 1024), 1),
+                    "pipelines": sorted(e.pipelines),
+                    "idle_seconds": round(now - e.last_used, 1),
+                }
+                for key, e in self._entries.items()
+            ]
+
+
+REGISTRY = ModelRegistry()
@@ -0,0 +1,295 @@
+# model_server.py
+# Optional out-of-process model server, so several Streamlit replicas on one machine share a single
+# copy of every model. JSON over local HTTP (standard library only) plus a pooled client.
+#
+#   python model_server.py --port 8765          # start it (warms WARMUP_MODELS first)
+#   MODEL_SERVER_URL=http://127.0.0.1:8765 streamlit run app.py
+#
+# With MODEL_SERVER_URL set the app only loads tokenizers; simplification batches, RAG generation
+# and embeddings all run in the server. Unset, everything runs in-process as before.
+
+import os
+import json
+import queue
+import threading
+import http.client
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODEL_SERVER_URL = os.getenv("MODEL_SERVER_URL", "").strip()
+# Idle keep-alive connections the client holds per server
+MODEL_SERVER_POOL_SIZE = int(os.getenv("MODEL_SERVER_POOL_SIZE", "8"))
+# Seconds to wait for a response (a large simplification batch can take a while on CPU)
+MODEL_SERVER_TIMEOUT = float(os.getenv("MODEL_SERVER_TIMEOUT", "300"))
+
+
+class ModelServerError(RuntimeError):
+    """The model server was unreachable or answered with an error."""
+
+
+# ════════════════════════════════════════════════════════════════
+# CLIENT
+# ════════════════════════════════════════════════════════════════
+
+class ModelServerClient:
+    """Thread-safe client over a small pool of keep-alive HTTP connections."""
+
+    def __init__(self, url: str, pool_size: int = MODEL_SERVER_POOL_SIZE, timeout: float = MODEL_SERVER_TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"MODEL_SERVER_URL must look like http://host:port, got {url!r}")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max(1, pool_size))
+
+    # --- Connection pool ---
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _send(self, method: str, path: str, payload=None):
+        """Send one request (retrying once on a stale pooled connection); returns (conn, response)."""
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.HTTPException, ConnectionError, OSError) as e:
+                conn.close()
+                if attempt == 1:
+                    raise ModelServerError(f"Model server at {self.url} unreachable: {e}") from e
+
+    def _request(self, method: str, path: str, payload=None) -> dict:
+        conn, response = self._send(method, path, payload)
+        try:
+            data = json.loads(response.read() or b"{}")
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        if response.status != 200:
+            raise ModelServerError(data.get("error") or f"HTTP {response.status} from {path}")
+        return data
+
+    # --- Endpoints ---
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def simplify_batch(self, model_choice: str, jobs, precision: str = None) -> list:
+        """models._run_simplify_batch on the server; outputs aligned with jobs (None marks a failed chunk)."""
+        return self._request("POST", "/simplify_batch", {
+            "model_choice": model_choice, "jobs": jobs, "precision": precision,
+        })["outputs"]
+
+    def generate(self, prompts, priorities=None, **generate_kwargs) -> list:
+        """
+        RAG generator output per prompt (batched with other replicas' prompts on the server).
+        priorities: inference_scheduler priority per prompt, so background work stays behind live queries.
+        """
+        return self._request("POST", "/generate", {
+            "prompts": list(prompts), "priorities": list(priorities) if priorities else None,
+            "generate_kwargs": generate_kwargs,
+        })["texts"]
+
+    def generate_stream(self, prompt: str, priority: int = None, **generate_kwargs):
+        """Yield the RAG generator's answer in pieces as the server produces them."""
+        conn, response = self._send("POST", "/generate_stream", {
+            "prompt": prompt, "priority": priority, "generate_kwargs": generate_kwargs,
+        })
+        if response.status != 200:
+            data = json.loads(response.read() or b"{}")
+            self._release(conn)
+            raise ModelServerError(data.get("error") or f"HTTP {response.status} from /generate_stream")
+        try:
+            # One JSON object per line: {"text": piece} ... {"done": true} or {"error": message}
+            for line in response:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if "error" in event:
+                    raise ModelServerError(event["error"])
+                if event.get("done"):
+                    break
+                yield event["text"]
+            response.read()
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn)
+
+    def embed_documents(self, texts) -> list:
+        return self._request("POST", "/embed", {"texts": list(texts)})["vectors"]
+
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_model_client():
+    """The shared client when MODEL_SERVER_URL is set, else None (models run in this process)."""
+    global _CLIENT
+    if not MODEL_SERVER_URL:
+        return None
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = ModelServerClient(MODEL_SERVER_URL)
+    return _CLIENT
+
+
+# ════════════════════════════════════════════════════════════════
+# SERVER
+# ════════════════════════════════════════════════════════════════
+
+def _simplify_batch(payload: dict) -> dict:
+    import models
+    pipe = models.get_simplify_pipeline(payload["model_choice"], payload.get("precision"))
+    if isinstance(pipe, str):
+        raise ValueError(pipe)
+    return {"outputs": models._run_simplify_batch(pipe, payload["jobs"])}
+
+
+def _generate(payload: dict) -> dict:
+    from inference_scheduler import get_inference_scheduler
+    scheduler = get_inference_scheduler()
+    kwargs = payload.get("generate_kwargs") or {}
+    priorities = payload.get("priorities") or [None] * len(payload["prompts"])
+    futures = [
+        scheduler.submit(prompt, priority=priority, **kwargs)
+        for prompt, priority in zip(payload["prompts"], priorities)
+    ]
+    return {"texts": [future.result() for future in futures]}
+
+
+def _embed(payload: dict) -> dict:
+    from embedding_service import get_embedding_service
+    return {"vectors": get_embedding_service().embed_documents(payload["texts"])}
+
+
+def _health(_payload=None) -> dict:
+    from warmup import warmup_summary, model_status
+    from inference_scheduler import get_inference_scheduler
+    from embedding_service import get_embedding_service
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "warmup": warmup_summary(),
+        "models": model_status(),
+        "inference_scheduler": get_inference_scheduler().stats(),
+        "embedding_service": get_embedding_service().stats(),
+    }
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled client connections are reused
+    routes = {"/simplify_batch": _simplify_batch, "/generate": _generate, "/embed": _embed}
+
+    def _reply(self, status: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _payload(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, _health())
+        else:
+            self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        try:
+            payload = self._payload()
+        except Exception as e:
+            self._reply(400, {"error": f"Bad request: {e}"})
+            return
+        if self.path == "/generate_stream":
+            self._stream(payload)
+            return
+        handler = self.routes.get(self.path)
+        if handler is None:
+            self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        try:
+            self._reply(200, handler(payload))
+        except Exception as e:
+            print(f"❌ {self.path} failed: {e}")
+            self._reply(500, {"error": str(e)})
+
+    def _stream(self, payload: dict):
+        """Chunked NDJSON: one {"text": piece} line per streamed piece, then {"done": true}."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(event: dict):
+            line = (json.dumps(event) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+            self.wfile.flush()
+
+        try:
+            import models
+            pieces = models.stream_rag_generation(
+                payload["prompt"], priority=payload.get("priority"), **(payload.get("generate_kwargs") or {})
+            )
+            for piece in pieces:
+                send({"text": piece})
+            send({"done": True})
+        except Exception as e:
+            print(f"❌ /generate_stream failed: {e}")
+            send({"error": str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # One line per request is too noisy next to generation logs
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, warmup: bool = True):
+    """Run the model server in this process until interrupted."""
+    if MODEL_SERVER_URL:
+        # The server hosts the models itself; never forward to another server
+        raise SystemExit("Unset MODEL_SERVER_URL in the model server's environment.")
+    if warmup:
+        from warmup import start_warmup
+        start_warmup()
+    server = ThreadingHTTPServer((host, port), ModelRequestHandler)
+    server.daemon_threads = True
+    print(f"🚀 Model server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve ClauseEase models to local app replicas.")
+    parser.add_argument("--host", default=os.getenv("MODEL_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MODEL_SERVER_PORT", "8765")))
+    parser.add_argument("--no-warmup", action="store_true", help="Load models on first request instead")
+    args = parser.parse_args()
+    serve(args.host, args.port, warmup=not args.no_warmup)
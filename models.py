@@ -1,28 +1,18 @@
 # models.py - FIXED VERSION WITH NLTK HANDLING
+#
+# Importing this module is cheap: torch, transformers, sentence-transformers, LangChain, FAISS
+# and NLTK are imported inside the functions that use them, model paths are probed on first use
+# (MODEL_PATHS is resolved lazily through the module __getattr__), and NLTK data is checked once
+# on first tokenization. Run bench_import.py to measure the import-time budget.
 import os
 import glob
-import torch
-import numpy as np
 import re
 import logging
+import threading
 import time
-from transformers import (
-    AutoTokenizer,
-    AutoModelForSeq2SeqLM,
-    pipeline,
-)
-from sentence_transformers import SentenceTransformer
-import streamlit as st
-import nltk
-from huggingface_hub import snapshot_download
-
-# --- YOUR WORKING IMPORTS (keep these since they work) ---
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from langchain_huggingface.llms import HuggingFacePipeline
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_classic.chains import RetrievalQA
-from langchain_classic.prompts import PromptTemplate
+from simplify_cache import get_simplify_cache, make_cache_key
+from decoding_policy import DecodingPolicy, BEAM4, estimated_output_tokens
+from model_registry import REGISTRY, directory_bytes
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -32,8 +22,19 @@ logger = logging.getLogger(__name__)
 # NLTK DATA DOWNLOAD & SETUP (FIXED VERSION)
 # ════════════════════════════════════════════════════════════════
 
-def download_nltk_data():
-    """Download all required NLTK data with proper error handling."""
+# No download attempts (missing data falls back to the regex tokenizers)
+NLTK_OFFLINE = (
+    os.getenv("NLTK_OFFLINE", "0") == "1"
+    or os.getenv("HF_HUB_OFFLINE", "0") == "1"
+    or os.getenv("TRANSFORMERS_OFFLINE", "0") == "1"
+)
+
+_NLTK = {"checked": False, "module": None}
+_NLTK_LOCK = threading.Lock()
+
+def download_nltk_data(offline: bool = NLTK_OFFLINE):
+    """Download all required NLTK data with proper error handling (only checks when offline)."""
+    import nltk
     try:
         # Set NLTK data path
         nltk_data_path = os.getenv('NLTK_DATA', '/root/nltk_data')
@@ -48,26 +49,42 @@ def download_nltk_data():
                 nltk.data.find(f'tokenizers/{package}' if 'punkt' in package else f'corpora/{package}')
                 print(f"✅ NLTK {package} already available")
             except LookupError:
+                if offline:
+                    print(f"⚠️ NLTK {package} missing (offline mode, not downloading)")
+                    continue
                 print(f"📥 Downloading NLTK {package}...")
                 nltk.download(package, quiet=True, download_dir=nltk_data_path)
                 print(f"✅ Downloaded NLTK {package}")
                 
     except Exception as e:
         print(f"⚠️ NLTK download warning: {e}")
+        if offline:
+            return
         # Fallback: try basic punkt if punkt_tab fails
         try:
             nltk.download('punkt', quiet=True)
         except:
             pass
 
-# Download NLTK data immediately when module loads
-download_nltk_data()
+def _nltk():
+    """Import NLTK and check its data once per process; None if NLTK itself is unavailable."""
+    if not _NLTK["checked"]:
+        with _NLTK_LOCK:
+            if not _NLTK["checked"]:
+                try:
+                    import nltk
+                    download_nltk_data()
+                    _NLTK["module"] = nltk
+                except ImportError as e:
+                    print(f"⚠️ NLTK unavailable, using fallback tokenizers: {e}")
+                _NLTK["checked"] = True
+    return _NLTK["module"]
 
 # Safe tokenizer functions with fallbacks
 def safe_sent_tokenize(text):
     """Safe sentence tokenizer with fallback."""
     try:
-        return nltk.sent_tokenize(text)
+        return _nltk().sent_tokenize(text)
     except Exception as e:
         print(f"⚠️ NLTK sentence tokenizer failed, using fallback: {e}")
         # Simple fallback: split on periods and question marks
@@ -77,7 +94,7 @@ def safe_sent_tokenize(text):
 def safe_word_tokenize(text):
     """Safe word tokenizer with fallback."""
     try:
-        return nltk.word_tokenize(text)
+        return _nltk().word_tokenize(text)
     except Exception as e:
         print(f"⚠️ NLTK word tokenizer failed, using fallback: {e}")
         # Simple fallback: split on whitespace
@@ -99,6 +116,7 @@ MODEL_LIST = [EMB_ID, FLAN_ID, BART_LARGE_ID, DISTILBART_ID]
 
 def download_models():
     """Download all required models for the application."""
+    from huggingface_hub import snapshot_download
     print(f"Starting model downloads into: {MODELS_DIR}")
     os.makedirs(MODELS_DIR, exist_ok=True)
 
@@ -176,134 +194,548 @@ def get_model_paths():
     
     return model_paths
 
-# Initialize model paths
-MODEL_PATHS = get_model_paths()
-PIPELINES = {}  # Cache for loaded pipelines
+_MODEL_PATHS = None
+_MODEL_PATHS_LOCK = threading.Lock()
+
+def model_paths() -> dict:
+    """Model paths, probed on first use and cached (also exposed as the MODEL_PATHS attribute)."""
+    global _MODEL_PATHS
+    if _MODEL_PATHS is None:
+        with _MODEL_PATHS_LOCK:
+            if _MODEL_PATHS is None:
+                _MODEL_PATHS = get_model_paths()
+    return _MODEL_PATHS
+
+def __getattr__(name):
+    # Lazy module attributes: nothing below is computed or imported until someone asks for it
+    if name == "MODEL_PATHS":
+        return model_paths()
+    if name == "RegistryPipelineLLM":
+        return registry_pipeline_llm_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Loaded checkpoints and their pipelines live in model_registry.REGISTRY
+TOKENIZERS = {}  # Tokenizers only, for callers that never run the model in this process
+
+# "torch" (eager PyTorch) or "onnx" (ONNX Runtime CPU provider, falls back to torch)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+
+# "fp32" or "int8" (dynamic int8 Linear layers, torch backend only)
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32").lower()
 
 # ════════════════════════════════════════════════════════════════
-# TEXT SIMPLIFICATION (Fixed with safe NLTK tokenizer)
+# SEQ2SEQ MODEL LOADING (shared by simplification and RAG)
 # ════════════════════════════════════════════════════════════════
 
-def get_simplify_pipeline(model_choice: str):
-    """Load summarization/simplification model pipeline with enhanced error handling."""
-    if model_choice in PIPELINES:
-        return PIPELINES[model_choice]
-    
-    try:
-        task = "summarization"
-        model_dir = None
-        
-        if model_choice == "DistilBART":
-            model_dir = MODEL_PATHS["distilbart"]
-        elif model_choice == "BART-Large":
-            model_dir = MODEL_PATHS["bart_large"]
-        elif model_choice == "FLAN-T5":
-            model_dir = MODEL_PATHS["flan_t5"]
-            task = "text2text-generation"
-        else:
-            return f"Error: Unknown model choice '{model_choice}'"
-        
-        # Enhanced path validation
-        if not model_dir or not os.path.exists(model_dir):
-            return f"Error: Model directory not found → {model_dir}"
+def load_seq2seq_model(model_key: str, precision: str = None, progress=None):
+    """
+    Load (model, tokenizer, backend) for a MODEL_PATHS key using the configured backend and precision.
+    progress(fraction, stage), if given, is called as each loading stage starts (the fraction only
+    orders the stages; weights load in a single call that reports nothing in between).
+    """
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+    progress = progress or (lambda fraction, stage: None)
+    model_dir = model_paths()[model_key]
+    progress(0.1, "tokenizer")
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    precision = (precision or MODEL_PRECISION).lower()
 
-        # Load model with better error handling
+    if INFERENCE_BACKEND == "onnx":
+        if precision == "int8":
+            print(f"⚠️ int8 precision applies to the torch backend only; using fp32 ONNX for {model_key}")
         try:
-            tokenizer = AutoTokenizer.from_pretrained(model_dir)
-            model = AutoModelForSeq2SeqLM.from_pretrained(model_dir)
+            from onnx_backend import is_exported, load_onnx_seq2seq
+            progress(0.3, "onnx weights" if is_exported(model_key) else "onnx export")
+            return load_onnx_seq2seq(model_dir, model_key), tokenizer, "onnx"
         except Exception as e:
-            return f"Error: Failed to load model/tokenizer → {e}"
+            print(f"⚠️ ONNX backend unavailable for {model_key}, falling back to torch: {e}")
+
+    if precision == "int8":
+        from quantization import load_quantized_seq2seq
+        progress(0.3, "int8 weights")
+        # Quantized Linear kernels are CPU-only
+        return load_quantized_seq2seq(model_dir, model_key), tokenizer, "torch-cpu"
+
+    progress(0.3, "weights")
+    return AutoModelForSeq2SeqLM.from_pretrained(model_dir), tokenizer, "torch"
+
+def checkpoint_key(model_key: str, precision: str = None) -> str:
+    """Registry key for one set of weights; simplification and RAG share it for FLAN-T5."""
+    return f"{model_key}:{(precision or MODEL_PRECISION).lower()}"
+
+def get_seq2seq_pipeline(model_key: str, task: str, pipeline_name: str, precision: str = None, **pipeline_kwargs):
+    """Return a named pipeline over the shared checkpoint for model_key, loading it once."""
+    precision = (precision or MODEL_PRECISION).lower()
+    key = checkpoint_key(model_key, precision)
+    return REGISTRY.get_pipeline(
+        key,
+        pipeline_name,
+        loader=lambda: load_seq2seq_model(model_key, precision, progress=REGISTRY.progress_callback(key)),
+        builder=lambda model, tokenizer, backend: build_seq2seq_pipeline(
+            task, model, tokenizer, backend, **pipeline_kwargs
+        ),
+        expected_bytes=directory_bytes(model_paths()[model_key]),
+    )
+
+# Registry key for the shared sentence-embedding model
+EMBEDDING_KEY = "embed"
+
+def get_embedding_model():
+    """
+    Process-wide MiniLM embeddings, loaded once through the registry.
+    Callers embed through embedding_service, which batches requests from all sessions onto this model.
+    """
+    embed_dir = model_paths()["embed"]
+    if not embed_dir or not os.path.exists(embed_dir):
+        raise ValueError(f"Embedding model not found at {embed_dir}")
+
+    def _load():
+        from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+        REGISTRY.progress_callback(EMBEDDING_KEY)(0.2, "weights")
+        return HuggingFaceEmbeddings(model_name=embed_dir), None, "sentence-transformers"
+
+    return REGISTRY.get_model(EMBEDDING_KEY, _load, expected_bytes=directory_bytes(embed_dir)).model
 
+def get_rag_pipeline(precision: str = None):
+    """FLAN-T5 generator for RAG answers, sharing weights with the FLAN-T5 simplifier."""
+    gen_dir = model_paths()["flan_t5"]
+    if not gen_dir or not os.path.exists(gen_dir):
+        return f"Error: Generator model not found at {gen_dir}"
+    try:
+        return get_seq2seq_pipeline(
+            "flan_t5", "text2text-generation", "rag", precision, max_new_tokens=512
+        )
+    except Exception as e:
+        return f"Error: Failed to create RAG pipeline → {e}"
+
+def get_rag_tokenizer():
+    """
+    FLAN-T5 tokenizer for building RAG prompts, or an "Error:" string. With a model server only the
+    tokenizer is loaded here; otherwise it comes with the local generator (so this also loads it).
+    """
+    from model_server import get_model_client
+    if get_model_client() is not None:
+        return get_simplify_tokenizer("FLAN-T5")
+    pipe = get_rag_pipeline()
+    return pipe if isinstance(pipe, str) else pipe.tokenizer
+
+def build_seq2seq_pipeline(task: str, model, tokenizer, backend: str, **kwargs):
+    """Wrap a loaded model in a transformers pipeline (device only applies to torch models)."""
+    from transformers import pipeline
+
+    if backend == "torch-cpu":
+        kwargs["device"] = -1
+    elif backend == "torch":
+        import torch
         device = 0 if torch.cuda.is_available() else -1
         print(f"Device set to use {'cuda:' + str(device) if device != -1 else 'cpu'}")
+        kwargs["device"] = device
+    return pipeline(task, model=model, tokenizer=tokenizer, **kwargs)
+
+# ════════════════════════════════════════════════════════════════
+# TEXT SIMPLIFICATION (Fixed with safe NLTK tokenizer)
+# ════════════════════════════════════════════════════════════════
+
+# Model choice → (MODEL_PATHS key, pipeline task)
+SIMPLIFY_MODELS = {
+    "DistilBART": ("distilbart", "summarization"),
+    "BART-Large": ("bart_large", "summarization"),
+    "FLAN-T5": ("flan_t5", "text2text-generation"),
+}
+
+def _resolve_simplify_model(model_choice: str):
+    """Map a model choice to (model_key, model_dir, task), or return an "Error:" string."""
+    if model_choice not in SIMPLIFY_MODELS:
+        return f"Error: Unknown model choice '{model_choice}'"
+    model_key, task = SIMPLIFY_MODELS[model_choice]
+    model_dir = model_paths()[model_key]
+
+    # Enhanced path validation
+    if not model_dir or not os.path.exists(model_dir):
+        return f"Error: Model directory not found → {model_dir}"
+    return model_key, model_dir, task
+
+def get_simplify_tokenizer(model_choice: str):
+    """Load just the tokenizer for a model choice (cheap; used when generation runs elsewhere)."""
+    if model_choice in TOKENIZERS:
+        return TOKENIZERS[model_choice]
 
+    resolved = _resolve_simplify_model(model_choice)
+    if isinstance(resolved, str):
+        return resolved
+    loaded = REGISTRY.peek(checkpoint_key(resolved[0]))
+    if loaded is not None:
+        return loaded.tokenizer
+    try:
+        from transformers import AutoTokenizer
+        TOKENIZERS[model_choice] = AutoTokenizer.from_pretrained(resolved[1])
+        return TOKENIZERS[model_choice]
+    except Exception as e:
+        return f"Error: Failed to load tokenizer → {e}"
+
+def get_simplify_pipeline(model_choice: str, precision: str = None):
+    """Load summarization/simplification model pipeline with enhanced error handling."""
+    try:
+        resolved = _resolve_simplify_model(model_choice)
+        if isinstance(resolved, str):
+            return resolved
+        model_key, model_dir, task = resolved
+
+        # Load model (or reuse the registry's copy) with better error handling
         try:
-            pipe = pipeline(task, model=model, tokenizer=tokenizer, device=device)
-            PIPELINES[model_choice] = pipe
-            return pipe
+            return get_seq2seq_pipeline(model_key, task, "simplify", precision)
         except Exception as e:
-            return f"Error: Pipeline creation failed → {e}"
+            return f"Error: Failed to load model/tokenizer → {e}"
             
     except Exception as e:
         error_msg = f"Error: Unexpected error in get_simplify_pipeline → {e}"
         print(error_msg)
-        PIPELINES[model_choice] = error_msg
         return error_msg
 
-def simplify_text(text: str, model_choice: str = "DistilBART", level: str = "Intermediate") -> str:
-    """Your excellent simplification with safe NLTK tokenizer"""
+# Level-specific length ratios for the summarization models (min, max)
+LEVEL_SUMMARY_RATIOS = {
+    "Basic": (0.3, 0.7),
+    "Intermediate": (0.5, 0.9),
+    "Advanced": (0.6, 1.0),
+}
+
+# Level-specific prompts for FLAN-T5
+LEVEL_INSTRUCTIONS = {
+    "Basic": "Rewrite the following text to be extremely simple, as if explaining to a 10-year-old. Use very short sentences and everyday words. Replace legal jargon with simple explanations.",
+    "Intermediate": "Rewrite the following text in simple, plain English. Replace complex legal words with common equivalents (e.g., 'heretofore' means 'previously', 'terminate' means 'end'). Do not summarize the text, just rewrite it to be easier to understand.",
+    "Advanced": "Rewrite the following text to be professional, modern, and clear, while maintaining all legal nuance. Focus on improving flow and readability. Do not shorten or summarize.",
+}
+
+# Bump whenever prompts or length ratios change so cached outputs are not reused
+SIMPLIFY_PROMPT_VERSION = 1
+
+# Number of chunks sent through generate() together (tune per CPU box)
+SIMPLIFY_BATCH_SIZE = int(os.getenv("SIMPLIFY_BATCH_SIZE", "8"))
+
+# Max tokenizer tokens per packed chunk (0 = one sentence per chunk)
+SIMPLIFY_TOKEN_BUDGET = int(os.getenv("SIMPLIFY_TOKEN_BUDGET", "512"))
+
+
+def pack_sentences(sentences, tokenizer, token_budget: int):
+    """Greedily pack consecutive sentences into chunks of at most token_budget model tokens."""
+    if token_budget <= 0 or not sentences:
+        return list(sentences)
+
     try:
-        pipe = get_simplify_pipeline(model_choice)
-        if isinstance(pipe, str) and pipe.startswith("Error:"): 
-            return pipe
-        
-        if not text or not text.strip(): 
-            return "Error: Input text is empty."
-
-        # Use safe sentence tokenizer instead of nltk.sent_tokenize
-        chunks = safe_sent_tokenize(text)
-        outputs = []
-
-        # Your excellent level-specific logic
-        if level == "Basic": 
-            min_sum_ratio, max_sum_ratio = (0.3, 0.7)
-        elif level == "Advanced": 
-            min_sum_ratio, max_sum_ratio = (0.6, 1.0) 
-        else: 
-            min_sum_ratio, max_sum_ratio = (0.5, 0.9)
-
-        for i, chunk in enumerate(chunks):
-            # Use safe word tokenizer instead of len(chunk.split())
-            chunk_words = safe_word_tokenize(chunk)
-            chunk_word_count = len(chunk_words)
-            
-            if chunk_word_count < 8:
-                outputs.append(chunk)
-                continue
+        lengths = [len(ids) for ids in tokenizer(list(sentences), add_special_tokens=False)["input_ids"]]
+        special_tokens = tokenizer.num_special_tokens_to_add()
+    except Exception as e:
+        print(f"⚠️ Tokenizer length check failed, using word counts: {e}")
+        lengths = [len(safe_word_tokenize(s)) for s in sentences]
+        special_tokens = 0
 
-            # Your excellent prompt engineering
-            if pipe.task == "text2text-generation":
-                min_len = int(chunk_word_count * 0.8)
-                max_len = int(chunk_word_count * 1.5)
-                min_len = max(10, min_len)
-                max_len = max(min_len + 20, max_len)
-                
-                # Your great level-specific prompts
-                if level == "Basic":
-                    level_instruction = "Rewrite the following text to be extremely simple, as if explaining to a 10-year-old. Use very short sentences and everyday words. Replace legal jargon with simple explanations."
-                elif level == "Advanced":
-                    level_instruction = "Rewrite the following text to be professional, modern, and clear, while maintaining all legal nuance. Focus on improving flow and readability. Do not shorten or summarize."
-                else:
-                    level_instruction = "Rewrite the following text in simple, plain English. Replace complex legal words with common equivalents (e.g., 'heretofore' means 'previously', 'terminate' means 'end'). Do not summarize the text, just rewrite it to be easier to understand."
+    chunks, current, current_len = [], [], special_tokens
+    for sentence, length in zip(sentences, lengths):
+        # A sentence longer than the budget still becomes its own chunk
+        if current and current_len + length > token_budget:
+            chunks.append(" ".join(current))
+            current, current_len = [], special_tokens
+        current.append(sentence)
+        current_len += length
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
 
-                prompt = f"{level_instruction}\n\nOriginal Text: \"{chunk}\"\n\nSimplified Text:"
-            else:
-                min_len = max(10, int(chunk_word_count * min_sum_ratio))
-                max_len = max(min_len + 10, int(chunk_word_count * max_sum_ratio))
-                prompt = chunk
-            
-            try:
-                if pipe.task == "text2text-generation":
-                    output = pipe(prompt, max_new_tokens=max_len, min_new_tokens=min_len, num_beams=4, early_stopping=True)
-                    if output and isinstance(output, list) and 'generated_text' in output[0]:
-                        outputs.append(output[0]['generated_text'])
-                    else:
-                        outputs.append(chunk)
+
+def _chunk_token_budget(task: str, tokenizer, level: str, token_budget: int) -> int:
+    """Clamp the packing budget to what the encoder can take once the prompt wrapper is added."""
+    if token_budget <= 0:
+        return 0
+    encoder_limit = getattr(tokenizer, "model_max_length", 1024)
+    if not encoder_limit or encoder_limit > 100_000:
+        encoder_limit = 1024
+
+    overhead = 0
+    if task == "text2text-generation":
+        level_instruction = LEVEL_INSTRUCTIONS.get(level, LEVEL_INSTRUCTIONS["Intermediate"])
+        wrapper = f"{level_instruction}\n\nOriginal Text: \"\"\n\nSimplified Text:"
+        try:
+            overhead = len(tokenizer(wrapper, add_special_tokens=False)["input_ids"])
+        except Exception:
+            overhead = len(wrapper.split()) * 2
+    return max(1, min(token_budget, encoder_limit - overhead))
+
+
+class StopOnEvent:
+    """
+    Stops generation once event is set (e.g. nobody is reading a streamed answer any more).
+    Duck-typed against transformers.StoppingCriteria like ChunkLengthLogitsProcessor below.
+    """
+
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return input_ids.new_full((input_ids.shape[0],), int(self.event.is_set())).bool()
+
+
+class ChunkLengthLogitsProcessor:
+    """
+    Applies a separate min/max new-token window to every chunk of a padded batch.
+    Duck-typed against transformers.LogitsProcessor so defining it doesn't import transformers.
+    """
+
+    def __init__(self, min_new_tokens, max_new_tokens, eos_token_id):
+        self.min_new_tokens = list(min_new_tokens)
+        self.max_new_tokens = list(max_new_tokens)
+        self.eos_token_id = eos_token_id
+        self._start_length = None
+
+    def __call__(self, input_ids, scores):
+        if self._start_length is None:
+            self._start_length = input_ids.shape[-1]
+        generated = input_ids.shape[-1] - self._start_length
+        # Beam search expands every chunk into num_beams consecutive rows
+        rows_per_chunk = max(1, scores.shape[0] // len(self.min_new_tokens))
+
+        for i, (min_len, max_len) in enumerate(zip(self.min_new_tokens, self.max_new_tokens)):
+            rows = slice(i * rows_per_chunk, (i + 1) * rows_per_chunk)
+            if generated < min_len:
+                scores[rows, self.eos_token_id] = -float("inf")
+            elif generated >= max_len - 1:
+                # Force EOS so this chunk stops at its own max_new_tokens
+                scores[rows, :] = -float("inf")
+                scores[rows, self.eos_token_id] = 0.0
+        return scores
+
+
+def _build_simplify_job(task: str, index: int, chunk: str, level: str):
+    """Build the prompt and length window for one chunk, or None to pass it through untouched."""
+    # Use safe word tokenizer instead of len(chunk.split())
+    chunk_word_count = len(safe_word_tokenize(chunk))
+    if chunk_word_count < 8:
+        return None
+
+    if task == "text2text-generation":
+        min_len = max(10, int(chunk_word_count * 0.8))
+        max_len = max(min_len + 20, int(chunk_word_count * 1.5))
+        level_instruction = LEVEL_INSTRUCTIONS.get(level, LEVEL_INSTRUCTIONS["Intermediate"])
+        prompt = f"{level_instruction}\n\nOriginal Text: \"{chunk}\"\n\nSimplified Text:"
+    else:
+        min_sum_ratio, max_sum_ratio = LEVEL_SUMMARY_RATIOS.get(level, LEVEL_SUMMARY_RATIOS["Intermediate"])
+        min_len = max(10, int(chunk_word_count * min_sum_ratio))
+        max_len = max(min_len + 10, int(chunk_word_count * max_sum_ratio))
+        prompt = chunk
+
+    return {"index": index, "chunk": chunk, "prompt": prompt, "min_len": min_len, "max_len": max_len}
+
+
+def _sort_jobs_by_token_length(tokenizer, jobs):
+    """Order jobs by prompt token count so each padded batch wastes as little as possible."""
+    try:
+        lengths = [len(ids) for ids in tokenizer([job["prompt"] for job in jobs])["input_ids"]]
+    except Exception:
+        lengths = [len(job["prompt"].split()) for job in jobs]
+    return [job for _, job in sorted(zip(lengths, jobs), key=lambda pair: pair[0])]
+
+
+def _run_simplify_batch(pipe, jobs):
+    """Run one padded batch through the pipeline; returns outputs aligned with jobs (None on failure)."""
+    output_key = "generated_text" if pipe.task == "text2text-generation" else "summary_text"
+    # Every job in a batch shares the decoding strategy picked by the policy
+    num_beams = jobs[0].get("num_beams", 4)
+    beam_kwargs = {"num_beams": num_beams, "early_stopping": True} if num_beams > 1 else {"num_beams": 1}
+    length_processor = ChunkLengthLogitsProcessor(
+        [job["min_len"] for job in jobs],
+        [job["max_len"] for job in jobs],
+        pipe.tokenizer.eos_token_id,
+    )
+    from transformers import LogitsProcessorList
+
+    try:
+        results = pipe(
+            [job["prompt"] for job in jobs],
+            batch_size=len(jobs),
+            max_new_tokens=max(job["max_len"] for job in jobs),
+            # Overrides the config min_length (56 for BART-Large-CNN / DistilBART) so only the
+            # per-chunk processor decides how long each output must be
+            min_new_tokens=0,
+            logits_processor=LogitsProcessorList([length_processor]),
+            truncation=True,
+            **beam_kwargs,
+        )
+    except Exception as batch_e:
+        print(f"Error processing batch of {len(jobs)} chunks: {batch_e}")
+        return [None] * len(jobs)
+
+    # None marks a chunk the model did not produce output for
+    outputs = []
+    for result in results:
+        item = result[0] if isinstance(result, list) and result else result
+        if isinstance(item, dict) and output_key in item:
+            outputs.append(item[output_key])
+        else:
+            outputs.append(None)
+    return outputs
+
+
+# Chunks per document-order window when streaming (length-sorted only inside a window)
+SIMPLIFY_STREAM_WINDOW = int(os.getenv("SIMPLIFY_STREAM_WINDOW", "4"))
+
+# Worker processes for simplification (0 or 1 = run in this process)
+SIMPLIFY_WORKERS = int(os.getenv("SIMPLIFY_WORKERS", "0"))
+
+
+def join_simplified_chunks(outputs) -> str:
+    """Join per-chunk outputs (in document order) into the final simplified text."""
+    simplified = " ".join(outputs)
+    cleaned_simplified = re.sub(r'\n\s*\n', '\n\n', simplified)
+    cleaned_simplified = re.sub(r'(\n\n){2,}', '\n\n', cleaned_simplified)
+    return cleaned_simplified.strip()
+
+
+def simplify_text_iter(text: str, model_choice: str = "DistilBART", level: str = "Intermediate",
+                       batch_size: int = None, token_budget: int = None, workers: int = None,
+                       precision: str = None, use_cache: bool = True,
+                       profile: str = "full", decoding_policy: DecodingPolicy = None):
+    """
+    Yield (chunk_index, original, simplified) as each chunk finishes.
+    With workers > 1, batches run on the shared simplification process pool.
+    The decoding strategy per batch comes from decoding_policy (or one built from
+    profile: "full" = 4-beam everywhere, "fast" = fit the latency budget); pass your
+    own DecodingPolicy to read back the per-chunk decisions afterwards.
+    Raises ValueError("Error: ...") if the model or input is unusable.
+    """
+    if not text or not text.strip():
+        raise ValueError("Error: Input text is empty.")
+
+    precision = (precision or MODEL_PRECISION).lower()
+    policy = decoding_policy or DecodingPolicy.for_profile(profile)
+
+    if workers is None:
+        workers = SIMPLIFY_WORKERS
+    from model_server import get_model_client
+    client = get_model_client()
+    # A model server replaces the local pool
+    use_pool = workers > 1 and client is None
+
+    resolved = _resolve_simplify_model(model_choice)
+    if isinstance(resolved, str):
+        raise ValueError(resolved)
+    _model_key, model_dir, task = resolved
+
+    if use_pool or client is not None:
+        # The workers (or the model server) hold the models; this process only needs the tokenizer
+        pipe = None
+        tokenizer = get_simplify_tokenizer(model_choice)
+        if isinstance(tokenizer, str):
+            raise ValueError(tokenizer)
+    else:
+        pipe = get_simplify_pipeline(model_choice, precision)
+        if isinstance(pipe, str) and pipe.startswith("Error:"):
+            raise ValueError(pipe)
+        tokenizer = pipe.tokenizer
+
+    batch_size = max(1, batch_size or SIMPLIFY_BATCH_SIZE)
+    if token_budget is None:
+        token_budget = SIMPLIFY_TOKEN_BUDGET
+
+    # Sentences of each clause (so none straddles a clause boundary), packed up to the model's token budget
+    from segmenter import segment_document, clause_units
+    chunks = pack_sentences(
+        [sentence for unit in clause_units(text, segment_document(text)) for sentence in safe_sent_tokenize(unit)],
+        tokenizer,
+        _chunk_token_budget(task, tokenizer, level, token_budget),
+    )
+
+    jobs = []
+    for i, chunk in enumerate(chunks):
+        job = _build_simplify_job(task, i, chunk, level)
+        if job is None:
+            # Too short to simplify: finished immediately
+            yield i, chunk, chunk
+        else:
+            jobs.append(job)
+
+    # Boilerplate clauses seen in any earlier document skip generation entirely
+    cache = get_simplify_cache()
+    model_id = f"{model_choice}:{model_dir}:{precision}"
+    for job in jobs:
+        job["cache_key"] = make_cache_key(job["chunk"], model_id, level, SIMPLIFY_PROMPT_VERSION)
+    cached = cache.get_many(job["cache_key"] for job in jobs) if use_cache else {}
+    for job in jobs:
+        if job["cache_key"] in cached:
+            yield job["index"], job["chunk"], cached[job["cache_key"]]
+    jobs = [job for job in jobs if job["cache_key"] not in cached]
+
+    # Walk the document in order, length-sorting only inside each window so the
+    # first output arrives early while batches stay tightly padded
+    window = batch_size * max(1, SIMPLIFY_STREAM_WINDOW)
+    batches = []
+    for window_start in range(0, len(jobs), window):
+        window_jobs = _sort_jobs_by_token_length(tokenizer, jobs[window_start:window_start + window])
+        for start in range(0, len(window_jobs), batch_size):
+            batches.append(window_jobs[start:start + batch_size])
+
+    remaining_tokens = estimated_output_tokens(jobs)
+    if use_pool:
+        # Strategies are planned up front; the pool runs batches concurrently
+        from simplify_pool import run_batches_in_pool
+        planned = []
+        for batch in batches:
+            strategy = policy.choose(batch, remaining_tokens, parallelism=workers)
+            remaining_tokens -= estimated_output_tokens(batch)
+            planned.append(policy.apply(batch, strategy))
+        batch_results = run_batches_in_pool(model_choice, planned, workers, precision)
+    else:
+        def _run_in_process(remaining_tokens):
+            for batch in batches:
+                strategy = policy.choose(batch, remaining_tokens)
+                remaining_tokens -= estimated_output_tokens(batch)
+                started = time.time()
+                planned_batch = policy.apply(batch, strategy)
+                if client is not None:
+                    try:
+                        results = client.simplify_batch(model_choice, planned_batch, precision)
+                    except Exception as e:
+                        print(f"Error processing batch of {len(planned_batch)} chunks on model server: {e}")
+                        results = [None] * len(planned_batch)
                 else:
-                    output = pipe(chunk, max_new_tokens=max_len, min_new_tokens=min_len, num_beams=4, early_stopping=True)
-                    if output and isinstance(output, list) and 'summary_text' in output[0]:
-                        outputs.append(output[0]['summary_text'])
-                    else:
-                        outputs.append(chunk)
-            except Exception as chunk_e:
-                print(f"Error processing chunk {i+1}: {chunk_e}")
-                outputs.append(chunk)
-        
-        simplified = " ".join(outputs)
-        cleaned_simplified = re.sub(r'\n\s*\n', '\n\n', simplified)
-        cleaned_simplified = re.sub(r'(\n\n){2,}', '\n\n', cleaned_simplified)
-        return cleaned_simplified.strip()
+                    results = _run_simplify_batch(pipe, planned_batch)
+                policy.observe(batch, strategy, time.time() - started)
+                yield planned_batch, results
+        batch_results = _run_in_process(remaining_tokens)
+
+    for batch, results in batch_results:
+        fresh = {}
+        for job, simplified in zip(batch, results):
+            if simplified is None:
+                yield job["index"], job["chunk"], job["chunk"]
+                continue
+            # Only full-quality output is shared through the cache
+            if job.get("decoding") == BEAM4.name:
+                fresh[job["cache_key"]] = simplified
+            yield job["index"], job["chunk"], simplified
+        if use_cache:
+            cache.put_many(fresh)
+
+
+def simplify_text(text: str, model_choice: str = "DistilBART", level: str = "Intermediate",
+                  batch_size: int = None, token_budget: int = None, workers: int = None,
+                  precision: str = None, use_cache: bool = True,
+                  profile: str = "full", decoding_policy: DecodingPolicy = None) -> str:
+    """Simplify text in token-budgeted chunks, running length-sorted chunks through the model in padded batches."""
+    try:
+        outputs = {}
+        for index, _original, simplified in simplify_text_iter(
+            text, model_choice=model_choice, level=level,
+            batch_size=batch_size, token_budget=token_budget, workers=workers,
+            precision=precision, use_cache=use_cache,
+            profile=profile, decoding_policy=decoding_policy
+        ):
+            outputs[index] = simplified
+        return join_simplified_chunks(outputs[i] for i in sorted(outputs))
 
+    except ValueError as e:
+        if str(e).startswith("Error:"):
+            return str(e)
+        return f"Error: Simplification failed → {e}"
     except Exception as e:
         return f"Error: Simplification failed → {e}"
 
@@ -311,6 +743,12 @@ def simplify_text(text: str, model_choice: str = "DistilBART", level: str = "Int
 # RAG IMPLEMENTATION (Your excellent version with enhanced robustness)
 # ════════════════════════════════════════════════════════════════
 
+# Bump when the prompt or retrieval changes so cached answers aren't served for the new pipeline
+RAG_ANSWER_VERSION = 3
+
+# Chunks retrieved per question; context_packer keeps as many as fit the generator's window
+RAG_RETRIEVAL_CANDIDATES = int(os.getenv("RAG_RETRIEVAL_CANDIDATES", "5"))
+
 PROMPT_TEMPLATE = """
 You are a helpful and conversational assistant. Use the provided context to answer the user's question.
 The user's recent chat history (if any) is provided before the main question.
@@ -325,114 +763,345 @@ Chat History & Question:
 
 Helpful Answer:"""
 
+def split_document(text: str):
+    """
+    RAG chunks of a document as LangChain Documents along clause boundaries (no overlap), each with
+    its start_index offset in text and the clause path it belongs to.
+    """
+    from langchain_core.documents import Document
+    from segmenter import segment_document, clause_spans
+
+    return [
+        Document(page_content=text[start:end], metadata={"start_index": start, "clause": clause.path})
+        for start, end, clause in clause_spans(text, segment_document(text))
+    ]
+
+_HYBRID_RETRIEVER_CLASS = None
+
+def hybrid_retriever_class():
+    """Build HybridRetriever on first use (its LangChain base class is a heavy import)."""
+    global _HYBRID_RETRIEVER_CLASS
+    if _HYBRID_RETRIEVER_CLASS is not None:
+        return _HYBRID_RETRIEVER_CLASS
+    from typing import Any
+    from langchain_core.retrievers import BaseRetriever
+
+    class HybridRetriever(BaseRetriever):
+        """LangChain retriever over ClauseEaseRAG.hybrid_search."""
+        search: Any
+        k: int = 3
+
+        def _get_relevant_documents(self, query: str, *, run_manager=None):
+            return self.search(query, self.k)
+
+    _HYBRID_RETRIEVER_CLASS = HybridRetriever
+    return _HYBRID_RETRIEVER_CLASS
+
+_REGISTRY_LLM_CLASS = None
+
+def registry_pipeline_llm_class():
+    """Build RegistryPipelineLLM on first use (its LangChain base class is a heavy import)."""
+    global _REGISTRY_LLM_CLASS
+    if _REGISTRY_LLM_CLASS is not None:
+        return _REGISTRY_LLM_CLASS
+    from langchain_core.language_models.llms import LLM
+
+    class RegistryPipelineLLM(LLM):
+        """LangChain LLM over the registry's FLAN-T5 RAG pipeline (no long-lived model reference)."""
+
+        @property
+        def _llm_type(self) -> str:
+            return "clauseease_registry_pipeline"
+
+        def _call(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+            # Batched with every other session's prompts on the scheduler thread
+            from inference_scheduler import get_inference_scheduler
+            return get_inference_scheduler().generate(prompt)
+
+    _REGISTRY_LLM_CLASS = RegistryPipelineLLM
+    return _REGISTRY_LLM_CLASS
+
+# Seconds to wait for the next streamed token before giving up on the generation
+RAG_STREAM_TIMEOUT = float(os.getenv("RAG_STREAM_TIMEOUT", "120"))
+
+def stream_rag_generation(prompt: str, priority: int = None, **generate_kwargs):
+    """Yield the RAG generator's answer to prompt as decoded text pieces, as soon as they are produced."""
+    from model_server import get_model_client
+    from inference_scheduler import get_inference_scheduler, current_priority
+    client = get_model_client()
+    if client is not None:
+        yield from client.generate_stream(
+            prompt, priority=current_priority() if priority is None else priority, **generate_kwargs
+        )
+        return
+
+    from transformers import TextIteratorStreamer, StoppingCriteriaList
+
+    pipe = get_rag_pipeline()
+    if isinstance(pipe, str):
+        raise ValueError(pipe)
+    streamer = TextIteratorStreamer(
+        pipe.tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=RAG_STREAM_TIMEOUT
+    )
+    stop = threading.Event()
+    # Generated on the scheduler thread (on its own, since a streamer takes a single sequence)
+    future = get_inference_scheduler().submit(
+        prompt, priority=priority, streamer=streamer,
+        stopping_criteria=StoppingCriteriaList([StopOnEvent(stop)]), **generate_kwargs
+    )
+    finished = False
+    try:
+        for piece in streamer:
+            if piece:
+                yield piece
+        finished = True
+    finally:
+        if not finished:
+            # Consumer went away or the streamer timed out: don't keep the scheduler thread generating
+            stop.set()
+            future.cancel()
+    future.result()
+
 class ClauseEaseRAG:
     """Your excellent RAG implementation with enhanced error handling"""
     
-    def __init__(self, document_text: str):
+    def __init__(self, document_text: str, vectorstore=None):
         # Enhanced validation
         if not document_text or len(document_text.strip()) < 10:
             raise ValueError("Document text is too short or empty for RAG initialization.")
         
         self.full_text = document_text 
         self.chat_history = []
+        # Token accounting of the most recent generated answer (see context_packer.pack_prompt)
+        self.last_pack_report = None
+        # Recent question embeddings, so routing, the answer cache and retrieval embed a question once
+        self._question_vectors = {}
+        from rag_index import content_hash
+        self.content_hash = content_hash(document_text)
         
         try:
-            # Your text splitting logic
-            self.splitter = RecursiveCharacterTextSplitter(
-                chunk_size=500, 
-                chunk_overlap=50, 
-                separators=["\n\n", "\n", ". ", " "]
-            )
-            docs = self.splitter.create_documents([document_text])
-            if not docs:
-                raise ValueError("Text splitting resulted in zero documents.")
-            
-            # Enhanced path validation
-            embed_dir = MODEL_PATHS["embed"]
-            if not embed_dir or not os.path.exists(embed_dir):
-                raise ValueError(f"Embedding model not found at {embed_dir}")
-                
-            self.embedding_model = HuggingFaceEmbeddings(model_name=embed_dir)
-            self.vectorstore = FAISS.from_documents(docs, self.embedding_model)
-            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
-            
-            # Generator pipeline with enhanced error handling
-            gen_dir = MODEL_PATHS["flan_t5"]
-            if not gen_dir or not os.path.exists(gen_dir):
-                raise ValueError(f"Generator model not found at {gen_dir}")
-            
-            rag_pipeline_key = "FLAN-T5-RAG"
-            if rag_pipeline_key not in PIPELINES:
-                try:
-                    generator_tokenizer = AutoTokenizer.from_pretrained(gen_dir)
-                    generator_model = AutoModelForSeq2SeqLM.from_pretrained(gen_dir)
-                    device_num = 0 if torch.cuda.is_available() else -1
-                    
-                    pipe = pipeline(
-                        "text2text-generation",
-                        model=generator_model,
-                        tokenizer=generator_tokenizer,
-                        max_new_tokens=512,
-                        device=device_num,
-                    )
-                    PIPELINES[rag_pipeline_key] = pipe
-                except Exception as e:
-                    raise ValueError(f"Failed to create RAG pipeline: {e}")
-            
-            pipe = PIPELINES[rag_pipeline_key]
-            if isinstance(pipe, str) and pipe.startswith("Error:"):
-                raise ValueError(f"RAG pipeline has error: {pipe}")
-            
-            llm = HuggingFacePipeline(pipeline=pipe)
+            from langchain_community.vectorstores import FAISS
+
+            # Micro-batched shared service (model usually already warm from warmup.py)
+            from embedding_service import get_embedding_service
+            self.embedding_model = get_embedding_service().langchain_embeddings()
+
+            if vectorstore is not None:
+                # Reopened document: index loaded from disk, nothing to split or embed
+                self.vectorstore = vectorstore
+            else:
+                docs = split_document(document_text)
+                if not docs:
+                    raise ValueError("Text splitting resulted in zero documents.")
+                self.vectorstore = FAISS.from_documents(docs, self.embedding_model)
+
+            # Clause tree shared with simplification chunking (built once per document)
+            from segmenter import segment_document
+            self.clause_tree = segment_document(document_text)
+
+            # Lexical side of hybrid retrieval, built once per document over the same chunks
+            from bm25 import BM25Index, sentence_index_for
+            self.chunks = [
+                self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[row])
+                for row in range(self.vectorstore.index.ntotal)
+            ]
+            self.chunk_index = BM25Index(chunk.page_content for chunk in self.chunks)
+            self.sentence_index = sentence_index_for(document_text)
+            self.retriever = hybrid_retriever_class()(search=self.hybrid_search, k=RAG_RETRIEVAL_CANDIDATES)
             
-            # Your prompt template
-            prompt = PromptTemplate(
-                template=PROMPT_TEMPLATE, 
-                input_variables=["context", "question"]
-            )
+            # Generator pipeline with enhanced error handling (loaded now so errors surface here)
+            tokenizer = get_rag_tokenizer()
+            if isinstance(tokenizer, str) and tokenizer.startswith("Error:"):
+                raise ValueError(f"RAG pipeline has error: {tokenizer}")
             
-            # Your QA chain
-            self.qa_chain = RetrievalQA.from_chain_type(
-                llm=llm,
-                retriever=self.retriever,
-                chain_type="stuff",
-                return_source_documents=False,
-                chain_type_kwargs={"prompt": prompt}
-            )
+            # Looks the pipeline up per call, so the registry can still evict it
+            self.llm = registry_pipeline_llm_class()()
             
         except Exception as e:
             raise ValueError(f"RAG initialization failed: {e}")
 
+    def embed_question(self, question: str):
+        """The question's embedding, memoized for the last few questions."""
+        vector = self._question_vectors.get(question)
+        if vector is None:
+            vector = self.embedding_model.embed_query(question)
+            self._question_vectors[question] = vector
+            while len(self._question_vectors) > 8:
+                self._question_vectors.pop(next(iter(self._question_vectors)))
+        return vector
+
+    def hybrid_search(self, query: str, k: int = 3):
+        """Top-k chunks by reciprocal rank fusion of the FAISS (dense) and BM25 (lexical) rankings."""
+        import numpy as np
+        from bm25 import reciprocal_rank_fusion
+
+        fetch = min(len(self.chunks), max(10, k * 4))
+        dense_rows = []
+        try:
+            vector = np.asarray([self.embed_question(query)], dtype="float32")
+            _, rows = self.vectorstore.index.search(vector, fetch)
+            dense_rows = [int(row) for row in rows[0] if row >= 0]
+        except Exception as e:
+            print(f"⚠️ Dense retrieval failed, using BM25 only: {e}")
+        lexical_rows = [i for i, _ in self.chunk_index.search(query, fetch)]
+        fused = reciprocal_rank_fusion([dense_rows, lexical_rows])
+        return [self.chunks[i] for i, _ in fused[:k]]
+
+    def lookup_clause(self, question: str):
+        """
+        The text of the clause a question points at ("show me section 8.2", "quote the termination
+        clause"), straight from the document without generation; None when nothing matches.
+        """
+        match = CLAUSE_REFERENCE_RE.search(question)
+        if match:
+            label = match.group(1).lower()
+            for node in self.clause_tree.walk():
+                if node.kind == "section" and node.label.lower() == label:
+                    return format_clause(node.path, self.full_text[node.start:node.end])
+            return None
+        # No explicit number: the best-matching chunk (whole clauses, labelled with their path)
+        best = self.hybrid_search(question, k=1)
+        if not best:
+            return None
+        return format_clause(best[0].metadata.get("clause", ""), best[0].page_content)
+
+    def build_prompt(self, question: str) -> str:
+        """
+        PROMPT_TEMPLATE filled with retrieved chunks and recent chat turns, packed to the generator's
+        token window (lowest-ranked chunks and oldest turns are dropped first).
+        """
+        from context_packer import pack_prompt
+
+        tokenizer = get_rag_tokenizer()
+        if isinstance(tokenizer, str):
+            raise ValueError(tokenizer)
+        chunks = [doc.page_content for doc in self.retriever.invoke(question)]
+        prompt, report = pack_prompt(tokenizer, PROMPT_TEMPLATE, question, chunks, self.chat_history)
+        self.last_pack_report = report
+        print(
+            f"📦 Packed {report['prompt_tokens']}/{report['limit']} tokens "
+            f"({report['chunks_used']} chunks, {report['history_turns_used']} turns; "
+            f"dropped {report['chunks_dropped']} chunks, {report['history_turns_dropped']} turns)"
+        )
+        return prompt
+
     def query(self, question: str) -> str:
         """Your excellent query method with enhanced error handling"""
         if not question or not question.strip():
             return "Please provide a question."
         
         try:
-            # Your chat history formatting
-            history_string = "\n".join(f"User: {q}\nAI: {a}" for q, a in self.chat_history)
-            combined_input = f"{history_string}\n\nUser: {question}"
-            
-            # Get response
-            response = self.qa_chain.invoke({"query": combined_input.strip()})
-            answer = response.get("result", "No answer generated.")
+            self.last_pack_report = None
+            # Answer cache: same document contents + same (or paraphrased) question → reuse the answer
+            from answer_cache import get_answer_cache
+            cache = get_answer_cache()
+            answer_model_id = answer_cache_model_id(self.chat_history)
+            answer, question_vector = cache.lookup(
+                self.content_hash, answer_model_id, question, embed=self.embed_question
+            )
+
+            if answer is None:
+                prompt = self.build_prompt(question)
+                
+                # Get response
+                answer = self.llm.invoke(prompt) or "No answer generated."
+                if answer and answer != "No answer generated.":
+                    cache.put(self.content_hash, answer_model_id, question, answer, question_vector)
             
             # Update history
-            self.chat_history.append((question, answer))
-            self.chat_history = self.chat_history[-3:]
+            self._remember(question, answer)
             
             return answer
             
         except Exception as e:
             return f"Error processing your question: {str(e)}"
 
-def create_rag_chain(text):
-    """Enhanced version with better error handling"""
+    def query_stream(self, question: str):
+        """query() as a generator: yields the answer in pieces as FLAN-T5 produces them (cached answers whole)."""
+        if not question or not question.strip():
+            yield "Please provide a question."
+            return
+        
+        try:
+            self.last_pack_report = None
+            from answer_cache import get_answer_cache
+            cache = get_answer_cache()
+            answer_model_id = answer_cache_model_id(self.chat_history)
+            answer, question_vector = cache.lookup(
+                self.content_hash, answer_model_id, question, embed=self.embed_question
+            )
+            if answer is not None:
+                self._remember(question, answer)
+                yield answer
+                return
+            
+            pieces = []
+            for piece in stream_rag_generation(self.build_prompt(question)):
+                pieces.append(piece)
+                yield piece
+            answer = "".join(pieces).strip()
+            if answer:
+                cache.put(self.content_hash, answer_model_id, question, answer, question_vector)
+            else:
+                answer = "No answer generated."
+                yield answer
+            self._remember(question, answer)
+            
+        except Exception as e:
+            yield f"Error processing your question: {str(e)}"
+
+    def _remember(self, question: str, answer: str):
+        """Keep the last three turns for the next prompt's chat history."""
+        self.chat_history.append((question, answer))
+        self.chat_history = self.chat_history[-3:]
+
+def embedding_model_id() -> str:
+    """Identifies the embedding model (saved indexes and cached vectors are only valid for it)."""
+    return os.path.basename(os.path.normpath(model_paths()["embed"] or EMB_ID))
+
+def answer_cache_model_id(history=()) -> str:
+    """
+    Generator weights plus prompt/retrieval version; cached answers are only valid for this combination.
+    With chat history the id also carries a hash of the turns (they are packed into the prompt), so a
+    follow-up answered in one conversation is only reused for that same conversation state.
+    """
+    model_id = f"{checkpoint_key('flan_t5')}:rag-v{RAG_ANSWER_VERSION}"
+    if history:
+        import hashlib
+        turns = "\x1e".join(f"{q}\x1f{a}" for q, a in history)
+        model_id += f":h{hashlib.sha256(turns.encode('utf-8')).hexdigest()[:16]}"
+    return model_id
+
+def create_rag_chain(text, tenant_db: str = None, document_id: int = None):
+    """
+    Enhanced version with better error handling.
+    With tenant_db and document_id, a saved index for this exact text is reused when one exists.
+    """
     try:
-        return ClauseEaseRAG(text)
+        vectorstore = None
+        if tenant_db and document_id is not None:
+            from rag_index import load_index
+            from embedding_service import get_embedding_service
+            start = time.time()
+            vectorstore = load_index(
+                tenant_db, document_id, text, get_embedding_service().langchain_embeddings(), embedding_model_id()
+            )
+            if vectorstore is not None:
+                print(f"✅ Loaded saved index for document {document_id} in {(time.time() - start) * 1000:.0f} ms")
+        return ClauseEaseRAG(text, vectorstore=vectorstore)
     except Exception as e:
         return f"Error: Failed to create RAG system → {str(e)}"
 
+def persist_rag_chain(chain, tenant_db: str, document_id: int) -> bool:
+    """Save a chain's index under the tenant so the document can be reopened without re-embedding."""
+    try:
+        from rag_index import save_index
+        save_index(tenant_db, document_id, chain.full_text, chain.vectorstore, embedding_model_id())
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to save index for document {document_id}: {e}")
+        return False
+
 # ------------------------------------------------------------------
 # --- YOUR EXCELLENT CHATBOT INTELLIGENCE (Keep exactly as is) ---
 # ------------------------------------------------------------------
@@ -461,7 +1130,38 @@ META_QUESTIONS = {
 
 DEFINITION_TRIGGERS = ['what is', "what's", 'what does', 'define', 'meaning of']
 
-def get_query_type(prompt: str) -> tuple:
+# "section 8.2", "clause 4", "article IV", "§ 12"
+CLAUSE_REFERENCE_RE = re.compile(r"(?:section|clause|article|§)\s*(\d+(?:\.\d+)*|[IVXLC]+)\b", re.IGNORECASE)
+# Clause lookups are quoted document text, not generated answers (fallback_answer leaves them alone)
+CLAUSE_LOOKUP_PREFIX = "📑 "
+CLAUSE_LOOKUP_MAX_CHARS = 1500
+
+def format_clause(path: str, text: str) -> str:
+    text = text.strip()
+    if len(text) > CLAUSE_LOOKUP_MAX_CHARS:
+        text = text[:CLAUSE_LOOKUP_MAX_CHARS].rsplit(" ", 1)[0] + " …"
+    heading = f"**{path}**" if path else "**From the document**"
+    return f"{CLAUSE_LOOKUP_PREFIX}{heading}\n\n{text}"
+
+def get_query_type(prompt: str, embed=None) -> tuple:
+    """
+    (canned answer or None, route) for a chat message, routed by query_router's intent centroids.
+    embed: the RAG chain's embed_question, so retrieval reuses the question's embedding.
+    Falls back to the keyword lists when the embedding model is unavailable.
+    """
+    try:
+        from query_router import get_query_router
+        decision = get_query_router().route(prompt, embed=embed)
+    except Exception as e:
+        print(f"⚠️ Embedding router unavailable, using keyword routing: {e}")
+        return _keyword_query_type(prompt)
+
+    print(f"🧭 Routed to {decision.route} ({decision.intent}, confidence {decision.confidence:.2f})")
+    if decision.route == 'chitchat':
+        return (CHITCHAT_RESPONSES[decision.intent], 'chitchat')
+    return (None, decision.route)
+
+def _keyword_query_type(prompt: str) -> tuple:
     """Your excellent query classification"""
     lower_prompt = prompt.lower().strip().rstrip('?!.')
     
@@ -492,27 +1192,35 @@ def get_query_type(prompt: str) -> tuple:
 
     return (None, 'rag')
 
-def query_rag_chain(chain, prompt):
-    """Your excellent routing logic"""
+def query_rag_chain(chain, prompt, route: tuple = None):
+    """Your excellent routing logic (route: a get_query_type result the caller already has)"""
     try:
-        final_answer, query_type = get_query_type(prompt)
+        final_answer, query_type = route or get_query_type(prompt, embed=getattr(chain, 'embed_question', None))
 
         if query_type == 'chitchat':
             return final_answer
 
+        if query_type == 'clause_lookup':
+            # Quoted straight from the clause tree / index; generation only if nothing matches
+            if callable(getattr(chain, 'lookup_clause', None)):
+                clause = chain.lookup_clause(prompt)
+                if clause:
+                    return clause
+            query_type = 'rag'
+
         if query_type == 'definition':
             try:
-                rag_pipeline_key = "FLAN-T5-RAG"
-                if rag_pipeline_key not in PIPELINES:
+                general_llm_tokenizer = get_rag_tokenizer()
+                if isinstance(general_llm_tokenizer, str):
                     return "General chat model is not available. Please re-upload the document."
                 
-                general_llm_pipe = PIPELINES[rag_pipeline_key]
                 general_prompt = f"Question: {prompt}\n\nHelpful Answer:"
                 
-                response = general_llm_pipe(general_prompt, max_new_tokens=256)
+                from inference_scheduler import get_inference_scheduler
+                response = get_inference_scheduler().generate(general_prompt, max_new_tokens=256)
                 
-                if response and 'generated_text' in response[0]:
-                    return response[0]['generated_text']
+                if response:
+                    return response
                 else:
                     return "I'm sorry, I had trouble forming a general answer."
             except Exception as e:
@@ -547,7 +1255,7 @@ def check_models_available():
     print("🔍 Checking model availability...")
     all_available = True
     
-    for model_key, model_path in MODEL_PATHS.items():
+    for model_key, model_path in model_paths().items():
         if model_path and os.path.exists(model_path):
             print(f"✅ {model_key}: Available at {model_path}")
         else:
@@ -577,48 +1285,63 @@ def initialize_models():
 # ENHANCED QUERY HANDLER FOR CHAT VIEW
 # ════════════════════════════════════════════════════════════════
 
-def handle_user_query(rag_chain, query: str, model_name: str = "FLAN-T5"):
+def needs_fallback(response) -> bool:
+    """Whether a RAG response is an error or 'not in the document' answer that fallback_answer replaces."""
+    return (isinstance(response, str) and not response.startswith(CLAUSE_LOOKUP_PREFIX) and
+            any(error_indicator in response.lower() for error_indicator in 
+                ['error', 'not in the document', 'sorry', 'failed', 'not available']))
+
+def fallback_answer(rag_chain, query: str, response, model_name: str = "FLAN-T5"):
+    """Replacement for an error or 'not in the document' RAG response, or None when the response is usable."""
+    # If RAG fails or returns error, try simplification as fallback
+    if not needs_fallback(response):
+        return None
+    
+    # Try to get document text and use simplification
+    if hasattr(rag_chain, 'full_text') and rag_chain.full_text:
+        document_text = rag_chain.full_text
+        
+        # Check if query is asking about document content
+        if any(keyword in query.lower() for keyword in 
+              ['summary', 'overview', 'what is this', 'what does this document']):
+            return simplify_text(document_text, model_choice=model_name, level="Basic")
+        
+        # For other queries, look the query terms up in the document's BM25 sentence index
+        from bm25 import sentence_index_for
+        sentence_index = getattr(rag_chain, 'sentence_index', None) or sentence_index_for(document_text)
+        relevant_sentences = sentence_index.top_sentences(query, k=3, document_order=True)
+        
+        if relevant_sentences:
+            relevant_text = " ".join(relevant_sentences)
+            return f"Based on the document content: {relevant_text}"
+    
+    
+    return "I couldn't find specific information about that in the document. The document might not contain detailed information on this topic."
+
+def handle_user_query(rag_chain, query: str, model_name: str = "FLAN-T5", route: tuple = None):
     """Enhanced query handler for chat view with better error handling."""
     try:
         # First try the standard RAG query
-        response = query_rag_chain(rag_chain, query)
-        
-        # If RAG fails or returns error, try simplification as fallback
-        if (isinstance(response, str) and 
-            any(error_indicator in response.lower() for error_indicator in 
-                ['error', 'not in the document', 'sorry', 'failed', 'not available'])):
-            
-            # Try to get document text and use simplification
-            if hasattr(rag_chain, 'full_text') and rag_chain.full_text:
-                document_text = rag_chain.full_text
-                
-                # Check if query is asking about document content
-                if any(keyword in query.lower() for keyword in 
-                      ['summary', 'overview', 'what is this', 'what does this document']):
-                    return simplify_text(document_text, model_choice=model_name, level="Basic")
-                
-                # For other queries, try to find relevant content
-                sentences = safe_sent_tokenize(document_text)
-                relevant_sentences = []
-                
-                query_words = set(safe_word_tokenize(query.lower()))
-                for sentence in sentences:
-                    sentence_words = set(safe_word_tokenize(sentence.lower()))
-                    if len(query_words.intersection(sentence_words)) > 0:
-                        relevant_sentences.append(sentence)
-                
-                if relevant_sentences:
-                    relevant_text = " ".join(relevant_sentences[:3])
-                    return f"Based on the document content: {relevant_text}"
-            
-            
-            return "I couldn't find specific information about that in the document. The document might not contain detailed information on this topic."
-        
-        return response
+        response = query_rag_chain(rag_chain, query, route)
+        return fallback_answer(rag_chain, query, response, model_name) or response
         
     except Exception as e:
         return f"I encountered an error while processing your question: {str(e)}"
 
+def stream_user_query(rag_chain, query: str, model_name: str = "FLAN-T5"):
+    """
+    handle_user_query as a generator: document questions stream token by token, other routes arrive whole.
+    Streamed answers aren't fallback-checked (they're already on screen); callers apply fallback_answer after.
+    """
+    route = get_query_type(query, embed=getattr(rag_chain, 'embed_question', None))
+    if route[1] != 'rag' or not callable(getattr(rag_chain, 'query_stream', None)):
+        yield handle_user_query(rag_chain, query, model_name, route)
+        return
+    try:
+        yield from rag_chain.query_stream(query)
+    except Exception as e:
+        yield f"I encountered an error while processing your question: {str(e)}"
+
 if __name__ == "__main__":
     if initialize_models():
         print("✅ All models initialized successfully!")
@@ -0,0 +1,45 @@
+# onnx_backend.py
+# Exports the local seq2seq snapshots to ONNX once and serves them through ONNX Runtime (CPU).
+
+import os
+import threading
+
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.abspath(os.path.join("models_cache", "onnx")))
+ONNX_PROVIDER = os.getenv("ONNX_PROVIDER", "CPUExecutionProvider")
+
+# Files optimum writes for an encoder-decoder export
+_REQUIRED_FILES = ("encoder_model.onnx", "decoder_model.onnx", "config.json")
+
+_EXPORT_LOCK = threading.Lock()
+
+
+def onnx_export_dir(cache_name: str) -> str:
+    """Where the exported graph for one model lives."""
+    return os.path.join(ONNX_CACHE_DIR, cache_name)
+
+
+def is_exported(cache_name: str) -> bool:
+    export_dir = onnx_export_dir(cache_name)
+    return all(os.path.exists(os.path.join(export_dir, f)) for f in _REQUIRED_FILES)
+
+
+def load_onnx_seq2seq(model_dir: str, cache_name: str):
+    """
+    Return an ORTModelForSeq2SeqLM for model_dir, exporting it on first use.
+    Raises on any failure so the caller can fall back to torch.
+    """
+    # Imported here: optimum/onnxruntime are only needed when the ONNX backend is selected
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    export_dir = onnx_export_dir(cache_name)
+    with _EXPORT_LOCK:
+        if not is_exported(cache_name):
+            print(f"📦 Exporting {cache_name} to ONNX (one-time) → {export_dir}")
+            model = ORTModelForSeq2SeqLM.from_pretrained(model_dir, export=True, provider=ONNX_PROVIDER)
+            os.makedirs(export_dir, exist_ok=True)
+            model.save_pretrained(export_dir)
+            print(f"✅ ONNX export complete for {cache_name}")
+            return model
+
+    print(f"✅ Loading cached ONNX graph for {cache_name}")
+    return ORTModelForSeq2SeqLM.from_pretrained(export_dir, provider=ONNX_PROVIDER)
@@ -0,0 +1,173 @@
+# precompute.py
+# Background answers to the Chat Support suggested questions, generated once a document has been
+# processed so clicking a suggestion is instant. One worker thread: jobs are cancellable per document
+# and the worker pauses between questions while any interactive query is running.
+# The generation itself runs on the inference scheduler's thread, where these prompts are queued at
+# background priority behind interactive ones (that queue, not the OS scheduler, is what makes them
+# yield). Questions whose answer would need a whole-document summary (meta route or summary fallback)
+# are left to be answered live.
+
+import os
+import copy
+import queue
+import threading
+from contextlib import contextmanager
+
+from db import save_suggested_answer, get_suggested_answers
+from inference_scheduler import background_priority
+
+# Shown in Chat Support and answered ahead of time (in display order)
+SUGGESTED_QUESTIONS = [
+    "Provide a comprehensive summary of this document",
+    "What are the main obligations and responsibilities?",
+    "Explain the termination conditions and procedures",
+    "What confidentiality requirements are specified?",
+    "Detail the payment terms and financial provisions",
+    "What governing law and jurisdiction apply?",
+    "Are there any liability limitations or warranties?",
+    "What are the key dates, deadlines and timelines?",
+    "Who are the parties involved and their roles?",
+    "What are the key deliverables and milestones?"
+]
+
+# Set PRECOMPUTE_SUGGESTIONS=0 to disable
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_SUGGESTIONS", "1") != "0"
+
+_jobs = queue.Queue()
+_cancel_events = {}  # (tenant_db, document_id) -> threading.Event
+_progress = {}  # (tenant_db, document_id) -> {"state", "done", "total"}
+_state_lock = threading.Lock()
+_worker = None
+
+_interactive = 0
+_idle = threading.Condition()
+
+
+@contextmanager
+def interactive_query():
+    """Wrap user-facing generation; the worker won't start another question until every one has finished."""
+    global _interactive
+    with _idle:
+        _interactive += 1
+    try:
+        yield
+    finally:
+        with _idle:
+            _interactive -= 1
+            _idle.notify_all()
+
+
+def _wait_for_idle(cancel: threading.Event):
+    with _idle:
+        while _interactive and not cancel.is_set():
+            _idle.wait(timeout=0.5)
+
+
+def _run_job(key, rag_chain, questions, cancel):
+    import models
+
+    tenant_db, document_id = key
+    chain = copy.copy(rag_chain)
+    # Own embedding memo: the user's chain evicts from its dict on the chat thread
+    chain._question_vectors = {}
+    existing = get_suggested_answers(tenant_db, document_id)
+
+    for question in questions:
+        if cancel.is_set():
+            break
+        if question not in existing:
+            _wait_for_idle(cancel)
+            if cancel.is_set():
+                break
+            # Fresh history per question, so answers never leak into (or depend on) the user's
+            # conversation or each other
+            chain.chat_history = []
+            route = models.get_query_type(question, embed=getattr(chain, 'embed_question', None))
+            answer = None
+            if route[1] != 'meta':
+                with background_priority():
+                    answer = models.query_rag_chain(chain, question, route)
+            if cancel.is_set():
+                break
+            # Unusable answers would fall back to simplifying the document on this thread
+            if answer and not models.needs_fallback(answer):
+                save_suggested_answer(tenant_db, document_id, question, answer)
+        with _state_lock:
+            _progress[key]["done"] += 1
+
+    with _state_lock:
+        _progress[key]["state"] = "cancelled" if cancel.is_set() else "done"
+        if _cancel_events.get(key) is cancel:
+            del _cancel_events[key]
+
+
+def _work():
+    while True:
+        key, rag_chain, questions, cancel = _jobs.get()
+        try:
+            if cancel.is_set():
+                with _state_lock:
+                    _progress[key]["state"] = "cancelled"
+                continue
+            with _state_lock:
+                _progress[key]["state"] = "running"
+            _run_job(key, rag_chain, questions, cancel)
+            if not cancel.is_set():
+                print(f"✅ Precomputed suggestion answers for document {key[1]}")
+        except Exception as e:
+            with _state_lock:
+                _progress[key]["state"] = "failed"
+            print(f"⚠️ Suggestion precomputation failed for document {key[1]}: {e}")
+        finally:
+            _jobs.task_done()
+
+
+def schedule(tenant_db: str, document_id: int, rag_chain, questions=None) -> bool:
+    """Queue background answers to the suggested questions for a processed document; False if disabled."""
+    global _worker
+    if not PRECOMPUTE_ENABLED or rag_chain is None or document_id is None:
+        return False
+
+    key = (tenant_db, int(document_id))
+    questions = list(questions or SUGGESTED_QUESTIONS)
+    cancel(tenant_db, document_id)
+    event = threading.Event()
+    with _state_lock:
+        _cancel_events[key] = event
+        _progress[key] = {"state": "queued", "done": 0, "total": len(questions)}
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name="suggestion-precompute", daemon=True)
+            _worker.start()
+    _jobs.put((key, rag_chain, questions, event))
+    return True
+
+
+def cancel(tenant_db: str, document_id: int) -> bool:
+    """Stop a queued or running job after its current question; True if there was one."""
+    if document_id is None:
+        return False
+    with _state_lock:
+        event = _cancel_events.pop((tenant_db, int(document_id)), None)
+    if event is None:
+        return False
+    event.set()
+    with _idle:
+        _idle.notify_all()
+    return True
+
+
+def get_answer(tenant_db: str, document_id: int, question: str):
+    """The stored answer to a suggested question, or None if it hasn't been precomputed."""
+    if document_id is None or question not in SUGGESTED_QUESTIONS:
+        return None
+    try:
+        return get_suggested_answers(tenant_db, int(document_id)).get(question)
+    except Exception as e:
+        print(f"⚠️ Could not read precomputed answers: {e}")
+        return None
+
+
+def status(tenant_db: str, document_id: int) -> dict:
+    """{"state": queued|running|done|cancelled|failed|none, "done": n, "total": m} for one document."""
+    with _state_lock:
+        return dict(_progress.get((tenant_db, int(document_id)), {"state": "none", "done": 0, "total": 0}))
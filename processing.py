@@ -1,6 +1,6 @@
 import streamlit as st
 import time
-from db import save_document, update_glossary_from_ai_output
+from db import save_document, get_document, load_chat_history, update_glossary_from_ai_output, get_glossary_terms
 from utils import get_word_count, is_likely_legal
 
 # --- NEW: Import the readability analyzer ---
@@ -30,6 +30,15 @@ def process_document_logic(tenant_db, tenant_user_id, source_type):
             current_step = "Building RAG Model"
             st.write(f"{current_step}...")
             try:
+                # The user has moved on from the previous document: stop precomputing its suggestions
+                import precompute
+                precompute.cancel(tenant_db, st.session_state.get("current_document_id"))
+
+                # Reprocessing a document drops answers cached for its previous processing
+                from answer_cache import get_answer_cache
+                from rag_index import content_hash
+                get_answer_cache().invalidate(content_hash(st.session_state.current_text))
+
                 st.session_state.rag_chain = models.create_rag_chain(st.session_state.current_text)
                 if isinstance(st.session_state.rag_chain, str) and st.session_state.rag_chain.startswith("Error:"):
                     raise ValueError(st.session_state.rag_chain)
@@ -46,14 +55,30 @@ def process_document_logic(tenant_db, tenant_user_id, source_type):
             current_step = f"Simplifying Text ({chosen_level})"
             st.write(f"{current_step} using {st.session_state.simplification_model}...")
             try:
-                s_text = models.simplify_text(
-                    st.session_state.current_text, 
-                    model_choice=st.session_state.simplification_model, 
-                    level=chosen_level
+                # Stream chunks into the simplified column as they finish
+                from views.assistant_view import render_simplified_stream
+                try:
+                    glossary_terms = get_glossary_terms(tenant_db)
+                except Exception:
+                    glossary_terms = {}
+
+                # Interactive uploads decode within the "fast" latency budget
+                decoding_policy = models.DecodingPolicy.for_profile("fast")
+                simplified_chunks = render_simplified_stream(
+                    models.simplify_text_iter(
+                        st.session_state.current_text,
+                        model_choice=st.session_state.simplification_model,
+                        level=chosen_level,
+                        decoding_policy=decoding_policy
+                    ),
+                    glossary_terms=glossary_terms,
+                    total_chars=len(st.session_state.current_text)
                 )
+                s_text = models.join_simplified_chunks(simplified_chunks)
                 st.session_state.simplified_text = s_text
-                if "Error:" in str(s_text):
-                    raise ValueError(f"Simplification failed: {s_text}")
+                st.session_state.decoding_report = decoding_policy.summary()
+                if not s_text:
+                    raise ValueError("Simplification failed: no output produced.")
             except Exception as e:
                 st.session_state.simplified_text = None
                 raise ValueError(f"Failed during Simplification step: {e}") from e
@@ -120,6 +145,22 @@ def process_document_logic(tenant_db, tenant_user_id, source_type):
                 wc_simple                        
             )
             st.session_state.current_document_id = int(doc_id)
+
+            # Persist the vector index so reopening this document skips re-embedding
+            models.persist_rag_chain(st.session_state.rag_chain, tenant_db, st.session_state.current_document_id)
+
+            # Add its chunks (reusing the vectors just computed) to the tenant-wide index
+            try:
+                import tenant_index
+                tenant_index.add_document(
+                    tenant_db, st.session_state.current_document_id,
+                    st.session_state.current_text, st.session_state.rag_chain.vectorstore
+                )
+            except Exception as index_e:
+                st.warning(f"Tenant-wide search index update failed: {index_e}")
+
+            # Answer the Chat Support suggestions in the background (low priority, yields to chat queries)
+            precompute.schedule(tenant_db, st.session_state.current_document_id, st.session_state.rag_chain)
             time.sleep(0.3)
 
             # --- Step 6: Auto-Glossary Update ---
@@ -149,7 +190,70 @@ def process_document_logic(tenant_db, tenant_user_id, source_type):
 
         st.session_state.model_ready = False
         st.session_state.simplified_text = None
+        st.session_state.decoding_report = None
         st.session_state.doc_analytics = None
         st.session_state.simplified_doc_analytics = None # <-- NEW
         st.session_state.rag_chain = None
-        return False
\ No newline at end of file
+        return False
+
+
+def open_document(tenant_db, tenant_user_id, document_id):
+    """Make a saved document current again, loading its RAG index from disk instead of re-embedding."""
+    import models
+
+    doc = get_document(tenant_db, document_id, tenant_user_id)
+    if doc is None:
+        raise ValueError(f"Document {document_id} not found.")
+
+    rag_chain = models.create_rag_chain(doc["original_text"], tenant_db, doc["id"])
+    if isinstance(rag_chain, str):
+        raise ValueError(rag_chain)
+
+    # The user has moved on from the previous document: stop precomputing its suggestions
+    previous_id = st.session_state.get("current_document_id")
+    if previous_id is not None and int(previous_id) != int(doc["id"]):
+        import precompute
+        precompute.cancel(tenant_db, previous_id)
+
+    st.session_state.update({
+        "current_document_id": int(doc["id"]),
+        "current_text": doc["original_text"],
+        "simplified_text": doc["simplified_text"],
+        "simplification_level": doc["simplification_level"] or st.session_state.get("simplification_level"),
+        "uploaded_file_name": doc["original_file_name"],
+        "current_title": doc["document_title"],
+        "is_likely_legal": None if doc["is_legal"] == -1 else bool(doc["is_legal"]),
+        "rag_chain": rag_chain,
+        "model_ready": True,
+        "chat_history": load_chat_history(tenant_db, doc["id"], tenant_user_id),
+        "uploaded_pdf_base64": None,
+        # Produced only while processing; never show the previously processed document's
+        "decoding_report": None,
+        "ai_issues": [],
+        "ai_risks": [],
+    })
+    try:
+        st.session_state.doc_analytics = analyze_readability(doc["original_text"])
+        st.session_state.simplified_doc_analytics = analyze_readability(doc["simplified_text"] or "")
+    except Exception:
+        st.session_state.doc_analytics = None
+        st.session_state.simplified_doc_analytics = None
+
+
+def ensure_rag_chain(tenant_db):
+    """Rebuild a missing RAG chain for the current document (e.g. after a restart) from its saved index."""
+    if st.session_state.get("rag_chain") or not st.session_state.get("current_document_id"):
+        return st.session_state.get("rag_chain")
+    if not st.session_state.get("current_text"):
+        return None
+
+    import models
+    rag_chain = models.create_rag_chain(
+        st.session_state.current_text, tenant_db, st.session_state.current_document_id
+    )
+    if isinstance(rag_chain, str):
+        print(f"⚠️ Could not restore RAG chain: {rag_chain}")
+        return None
+    st.session_state.rag_chain = rag_chain
+    st.session_state.model_ready = True
+    return rag_chain
@@ -0,0 +1,137 @@
+# quant_check.py
+# Accuracy guard for the int8 models: compares int8 and fp32 simplification on fixed legal sentences.
+#
+#   python quant_check.py                      # all models
+#   python quant_check.py --models DistilBART  # one model
+#
+# Exits non-zero if any model falls below the ROUGE-L floor or exceeds the readability delta.
+
+import sys
+import time
+import argparse
+
+LEGAL_SENTENCES = [
+    "This Agreement shall be governed by and construed in accordance with the laws of the State of New York, without regard to its conflict of laws principles.",
+    "Either party may terminate this Agreement upon thirty (30) days prior written notice to the other party in the event of a material breach that remains uncured.",
+    "The Receiving Party shall hold all Confidential Information in strict confidence and shall not disclose such information to any third party without the prior written consent of the Disclosing Party.",
+    "In no event shall either party be liable for any indirect, incidental, special, consequential or punitive damages arising out of or relating to this Agreement.",
+    "If any provision of this Agreement is held to be invalid or unenforceable, the remaining provisions shall continue in full force and effect.",
+    "The Licensee shall indemnify, defend and hold harmless the Licensor from and against any and all claims, losses, liabilities and expenses arising from the Licensee's use of the Software.",
+    "All notices required or permitted hereunder shall be in writing and shall be deemed given when delivered personally or sent by certified mail, return receipt requested.",
+    "Neither party shall be liable for any failure or delay in performance caused by events beyond its reasonable control, including acts of God, war, strikes or governmental action.",
+]
+
+
+def _tokens(text: str):
+    return [t for t in "".join(c.lower() if c.isalnum() else " " for c in text).split() if t]
+
+
+def _f1(overlap: int, candidate_len: int, reference_len: int) -> float:
+    if not overlap or not candidate_len or not reference_len:
+        return 0.0
+    precision = overlap / candidate_len
+    recall = overlap / reference_len
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_1(candidate: str, reference: str) -> float:
+    """Unigram-overlap F1."""
+    cand, ref = _tokens(candidate), _tokens(reference)
+    ref_counts = {}
+    for t in ref:
+        ref_counts[t] = ref_counts.get(t, 0) + 1
+    overlap = 0
+    for t in cand:
+        if ref_counts.get(t, 0) > 0:
+            overlap += 1
+            ref_counts[t] -= 1
+    return _f1(overlap, len(cand), len(ref))
+
+
+def rouge_l(candidate: str, reference: str) -> float:
+    """Longest-common-subsequence F1."""
+    cand, ref = _tokens(candidate), _tokens(reference)
+    if not cand or not ref:
+        return 0.0
+    prev = [0] * (len(ref) + 1)
+    for c in cand:
+        row = [0]
+        for j, r in enumerate(ref):
+            row.append(prev[j] + 1 if c == r else max(prev[j + 1], row[j]))
+        prev = row
+    return _f1(prev[-1], len(cand), len(ref))
+
+
+def check_model(model_choice: str, level: str):
+    """Run every sentence through fp32 and int8 and return the averaged comparison."""
+    import models
+    from readability import analyze_readability
+
+    results = {"fp32": [], "int8": []}
+    timings = {"fp32": 0.0, "int8": 0.0}
+    for precision in ("fp32", "int8"):
+        # Load outside the timed region so conversion/loading cost is not counted
+        pipe = models.get_simplify_pipeline(model_choice, precision)
+        if isinstance(pipe, str):
+            raise RuntimeError(pipe)
+        for sentence in LEGAL_SENTENCES:
+            start = time.time()
+            output = models.simplify_text(
+                sentence, model_choice=model_choice, level=level,
+                token_budget=0, workers=0, precision=precision, use_cache=False
+            )
+            timings[precision] += time.time() - start
+            if output.startswith("Error:"):
+                raise RuntimeError(output)
+            results[precision].append(output)
+
+    rouge1_scores, rougel_scores, readability_deltas = [], [], []
+    for fp32_out, int8_out in zip(results["fp32"], results["int8"]):
+        rouge1_scores.append(rouge_1(int8_out, fp32_out))
+        rougel_scores.append(rouge_l(int8_out, fp32_out))
+        readability_deltas.append(
+            analyze_readability(int8_out)["flesch_ease"] - analyze_readability(fp32_out)["flesch_ease"]
+        )
+
+    n = len(LEGAL_SENTENCES)
+    return {
+        "rouge_1": sum(rouge1_scores) / n,
+        "rouge_l": sum(rougel_scores) / n,
+        "readability_delta": sum(readability_deltas) / n,
+        "max_abs_readability_delta": max(abs(d) for d in readability_deltas),
+        "speedup": timings["fp32"] / timings["int8"] if timings["int8"] else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare int8 and fp32 simplification quality.")
+    parser.add_argument("--models", nargs="+", default=["DistilBART", "BART-Large", "FLAN-T5"])
+    parser.add_argument("--level", default="Intermediate")
+    parser.add_argument("--min-rouge-l", type=float, default=0.75)
+    parser.add_argument("--max-readability-delta", type=float, default=10.0)
+    args = parser.parse_args()
+
+    all_passed = True
+    for model_choice in args.models:
+        print(f"\n🔍 {model_choice} ({args.level})")
+        try:
+            report = check_model(model_choice, args.level)
+        except Exception as e:
+            print(f"❌ {model_choice}: check failed → {e}")
+            all_passed = False
+            continue
+
+        passed = (report["rouge_l"] >= args.min_rouge_l and
+                  abs(report["readability_delta"]) <= args.max_readability_delta)
+        all_passed = all_passed and passed
+        print(f"  ROUGE-1 vs fp32:        {report['rouge_1']:.3f}")
+        print(f"  ROUGE-L vs fp32:        {report['rouge_l']:.3f}")
+        print(f"  Flesch ease delta:      {report['readability_delta']:+.2f} (max |Δ| {report['max_abs_readability_delta']:.2f})")
+        print(f"  int8 speedup:           {report['speedup']:.2f}x")
+        print(f"  {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return 0 if all_passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+# quantization.py
+# Int8 dynamic quantization of the seq2seq models' Linear layers, cached on disk after the first conversion.
+
+import os
+import threading
+
+QUANTIZED_CACHE_DIR = os.getenv("QUANTIZED_CACHE_DIR", os.path.abspath(os.path.join("models_cache", "quantized")))
+
+_QUANTIZE_LOCK = threading.Lock()
+
+
+def quantized_model_path(cache_name: str) -> str:
+    return os.path.join(QUANTIZED_CACHE_DIR, f"{cache_name}-int8.pt")
+
+
+def load_quantized_seq2seq(model_dir: str, cache_name: str):
+    """
+    Return an int8 dynamically-quantized copy of the model in model_dir.
+    The first call converts the fp32 weights and pickles the result; later calls load that file.
+    """
+    import torch
+    from transformers import AutoModelForSeq2SeqLM
+
+    path = quantized_model_path(cache_name)
+    with _QUANTIZE_LOCK:
+        if os.path.exists(path):
+            print(f"✅ Loading cached int8 weights for {cache_name}")
+            model = torch.load(path, weights_only=False)
+            model.eval()
+            return model
+
+        print(f"⚙️ Quantizing {cache_name} to int8 (one-time)...")
+        fp32_model = AutoModelForSeq2SeqLM.from_pretrained(model_dir)
+        fp32_model.eval()
+        model = torch.ao.quantization.quantize_dynamic(fp32_model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        os.makedirs(QUANTIZED_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, path)
+        print(f"✅ Saved int8 weights for {cache_name} → {path}")
+        return model
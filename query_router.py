@@ -0,0 +1,163 @@
+# query_router.py
+# Routes chat questions by comparing one MiniLM embedding of the question with precomputed intent
+# centroids (mean embedding of a few example phrasings per intent), instead of keyword lists.
+
+import os
+import threading
+from collections import namedtuple
+
+# Below this cosine similarity to every centroid the question goes to full RAG
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.45"))
+# A non-RAG route must beat the RAG centroid by at least this much
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.05"))
+# Topic tags (AdvancedChatProcessor) need at least this similarity
+ROUTER_TOPIC_THRESHOLD = float(os.getenv("ROUTER_TOPIC_THRESHOLD", "0.4"))
+
+# route: chitchat | definition | meta | clause_lookup | rag; intent is the matched centroid
+# (e.g. "greeting"); vector is the question embedding for reuse by retrieval
+RouteDecision = namedtuple("RouteDecision", ["route", "intent", "confidence", "scores", "vector"])
+
+# intent -> (route, example phrasings)
+ROUTE_EXAMPLES = {
+    "greeting": ("chitchat", [
+        "hi", "hello", "hey", "howdy", "greetings", "good morning", "good afternoon", "good evening",
+        "hello there, how are you",
+    ]),
+    "thanks": ("chitchat", [
+        "thanks", "thank you", "thx", "appreciate it", "thanks a lot, that helps", "great, thank you so much",
+    ]),
+    "goodbye": ("chitchat", ["bye", "goodbye", "see you", "later", "that's all for now, bye", "see you later"]),
+    "help": ("chitchat", [
+        "what can you do", "help", "how do you work", "help me", "how do I use this",
+        "what kind of questions can I ask",
+    ]),
+    "definition": ("definition", [
+        "what is indemnification", "define force majeure", "meaning of arbitration",
+        "what does severability mean", "what is a non-compete clause in general",
+        "explain what a warranty is", "what's the legal meaning of consideration",
+    ]),
+    "meta": ("meta", [
+        "what is this", "what is this about", "what is this document", "what is this document about",
+        "the document is about what", "summarize this", "give me a summary", "summarize the document",
+        "give me an overview of this agreement",
+    ]),
+    "clause_lookup": ("clause_lookup", [
+        "show me section 5", "what does clause 8.2 say", "quote the termination clause",
+        "show the confidentiality section", "read me article 3", "give me the exact text of the payment clause",
+        "where is the governing law clause",
+    ]),
+    "rag": ("rag", [
+        "when can the contract be terminated", "who pays the fees under this agreement",
+        "what are my obligations", "how long is the notice period", "is the supplier liable for delays",
+        "what happens if payment is late", "which law governs this agreement", "who are the parties",
+    ]),
+}
+
+# Topic tags reported by AdvancedChatProcessor.analyze_query_intent
+TOPIC_EXAMPLES = {
+    "summary": ["give me a summary", "overview of the document", "what is the main purpose of this"],
+    "obligation": ["what are the obligations", "what must each party do", "what responsibilities are required"],
+    "termination": ["how can the agreement be terminated", "when does the contract end", "cancellation and expiry"],
+    "confidentiality": ["confidentiality requirements", "what must be kept secret", "non-disclosure obligations"],
+    "financial": ["payment terms", "what are the fees and costs", "how much is the price"],
+    "legal": ["governing law", "which jurisdiction applies", "dispute resolution and courts"],
+    "timeline": ["key dates and deadlines", "what is the timeline", "when is it due"],
+}
+
+
+def _normalize(matrix):
+    import numpy as np
+    matrix = np.asarray(matrix, dtype="float32")
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class QueryRouter:
+    """Nearest-centroid classifier over question embeddings; centroids are built once per process."""
+
+    def __init__(self, route_examples=None, topic_examples=None):
+        self.route_examples = route_examples or ROUTE_EXAMPLES
+        self.topic_examples = topic_examples or TOPIC_EXAMPLES
+        self._intents = None  # (names, routes, centroid matrix)
+        self._topics = None  # (names, centroid matrix)
+        self._lock = threading.Lock()
+
+    def _embed_many(self, texts) -> list:
+        # Through the shared service, so the example embeddings land in the embedding cache too
+        from embedding_service import get_embedding_service
+        return get_embedding_service().embed_documents(texts)
+
+    def _centroids(self, examples: dict):
+        names, flat, owners = list(examples), [], []
+        for i, name in enumerate(names):
+            phrases = examples[name][1] if isinstance(examples[name], tuple) else examples[name]
+            flat.extend(phrases)
+            owners.extend([i] * len(phrases))
+        import numpy as np
+        vectors = _normalize(self._embed_many(flat))
+        owners = np.asarray(owners)
+        centroids = np.stack([vectors[owners == i].mean(axis=0) for i in range(len(names))])
+        return names, _normalize(centroids)
+
+    def _ensure_centroids(self):
+        if self._intents is not None:
+            return
+        with self._lock:
+            if self._intents is None:
+                names, centroids = self._centroids(self.route_examples)
+                topic_names, topic_centroids = self._centroids(self.topic_examples)
+                self._topics = (topic_names, topic_centroids)
+                self._intents = (names, [self.route_examples[n][0] for n in names], centroids)
+
+    def embed(self, question: str, embed=None):
+        """The question's vector, from embed (e.g. a RAG chain's memoized embedder) or the shared service."""
+        if embed is not None:
+            return embed(question)
+        from embedding_service import get_embedding_service
+        return get_embedding_service().embed_query(question)
+
+    def route(self, question: str, embed=None, vector=None) -> RouteDecision:
+        """Route a question; pass the chain's embed function (or a vector) so retrieval reuses the embedding."""
+        self._ensure_centroids()
+        if vector is None:
+            vector = self.embed(question, embed)
+        names, routes, centroids = self._intents
+        similarities = centroids @ _normalize(vector)
+        scores = {name: round(float(score), 4) for name, score in zip(names, similarities)}
+
+        best = int(similarities.argmax())
+        route, intent, confidence = routes[best], names[best], float(similarities[best])
+        rag_score = max(float(s) for r, s in zip(routes, similarities) if r == "rag")
+        if route != "rag" and (confidence < ROUTER_MIN_CONFIDENCE or confidence - rag_score < ROUTER_MIN_MARGIN):
+            # Not clearly a cheap route: answering from the document is the safe default
+            route, intent, confidence = "rag", "rag", rag_score
+        return RouteDecision(route, intent, confidence, scores, vector)
+
+    def topics(self, question: str, embed=None, vector=None) -> dict:
+        """{'primary_intent', 'detected_intents', 'confidence'} topic tags for a question."""
+        self._ensure_centroids()
+        if vector is None:
+            vector = self.embed(question, embed)
+        names, centroids = self._topics
+        similarities = centroids @ _normalize(vector)
+        detected = [name for name, score in sorted(zip(names, similarities), key=lambda p: -p[1])
+                    if score >= ROUTER_TOPIC_THRESHOLD]
+        return {
+            "primary_intent": detected[0] if detected else "general",
+            "detected_intents": detected,
+            "confidence": round(float(similarities.max()), 4) if len(names) else 0.0,
+        }
+
+
+_ROUTER = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_query_router() -> QueryRouter:
+    """The process-wide router (centroids are computed on first use)."""
+    global _ROUTER
+    if _ROUTER is None:
+        with _ROUTER_LOCK:
+            if _ROUTER is None:
+                _ROUTER = QueryRouter()
+    return _ROUTER
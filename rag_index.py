@@ -0,0 +1,115 @@
+# rag_index.py
+# Tenant-scoped persistence of per-document FAISS indexes, so past documents reopen without re-embedding.
+#
+# Layout: db/tenants/<tenant>_indexes/doc_<id>/<content hash>/{index.faiss, chunks.json}
+
+import os
+import json
+import shutil
+import hashlib
+
+# Bump when chunking or embedding changes so stale indexes are rebuilt instead of loaded
+RAG_INDEX_VERSION = 3
+
+# 0 = always read indexes fully into memory
+RAG_INDEX_MMAP = os.getenv("RAG_INDEX_MMAP", "1") == "1"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def tenant_index_root(tenant_db: str) -> str:
+    """Index directory that sits next to (and is scoped like) the tenant's SQLite file."""
+    return f"{os.path.splitext(tenant_db)[0]}_indexes"
+
+
+def document_index_dir(tenant_db: str, document_id: int, text: str) -> str:
+    return os.path.join(tenant_index_root(tenant_db), f"doc_{int(document_id)}", content_hash(text)[:16])
+
+
+def save_index(tenant_db: str, document_id: int, text: str, vectorstore, embedding_id: str = "") -> str:
+    """
+    Write a LangChain FAISS vectorstore and its chunk texts for a document; returns the directory.
+    Indexes for older contents of the same document id are removed.
+    """
+    import faiss
+
+    target = document_index_dir(tenant_db, document_id, text)
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+
+    tmp_dir = f"{target}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    chunks = []
+    for row in range(vectorstore.index.ntotal):
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[row])
+        chunks.append({"page_content": doc.page_content, "metadata": doc.metadata})
+
+    faiss.write_index(vectorstore.index, os.path.join(tmp_dir, "index.faiss"))
+    with open(os.path.join(tmp_dir, "chunks.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": RAG_INDEX_VERSION,
+            "content_hash": content_hash(text),
+            "embedding_id": embedding_id,
+            "chunks": chunks,
+        }, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+
+    # Only the current contents of a document keep an index
+    for name in os.listdir(parent):
+        if os.path.join(parent, name) != target:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+    return target
+
+
+def load_index(tenant_db: str, document_id: int, text: str, embeddings, embedding_id: str = ""):
+    """
+    Load a saved index as a LangChain FAISS vectorstore (memory-mapped where FAISS supports it),
+    or None when nothing matching this document's contents and embedding model is on disk.
+    """
+    index_dir = document_index_dir(tenant_db, document_id, text)
+    index_path = os.path.join(index_dir, "index.faiss")
+    chunks_path = os.path.join(index_dir, "chunks.json")
+    if not (os.path.exists(index_path) and os.path.exists(chunks_path)):
+        return None
+
+    try:
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if (saved.get("version") != RAG_INDEX_VERSION
+                or saved.get("content_hash") != content_hash(text)
+                or saved.get("embedding_id") != embedding_id):
+            return None
+
+        import faiss
+        from langchain_core.documents import Document
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        index = None
+        if RAG_INDEX_MMAP:
+            try:
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except Exception:
+                index = None  # This index type can't be mapped; read it normally
+        if index is None:
+            index = faiss.read_index(index_path)
+
+        if index.ntotal != len(saved["chunks"]):
+            print(f"⚠️ Saved index for document {document_id} is inconsistent; rebuilding")
+            return None
+
+        docstore_ids = [str(row) for row in range(index.ntotal)]
+        docstore = InMemoryDocstore({
+            docstore_id: Document(page_content=chunk["page_content"], metadata=chunk.get("metadata") or {})
+            for docstore_id, chunk in zip(docstore_ids, saved["chunks"])
+        })
+        return FAISS(embeddings, index, docstore, dict(enumerate(docstore_ids)))
+    except Exception as e:
+        print(f"⚠️ Failed to load saved index for document {document_id}: {e}")
+        return None
@@ -0,0 +1,285 @@
+# segmenter.py
+# Legal-structure segmentation: numbered sections, headings, definitions, list items and paragraphs
+# as a clause tree with character offsets, built once per document and shared by RAG chunking
+# and simplification chunking.
+
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Longest RAG chunk in characters (whole clauses are merged up to this, never overlapped)
+CLAUSE_CHUNK_CHARS = 500
+
+# Longest own text (heading line) a section may carry into its first clause's span
+CLAUSE_HEADING_CHARS = 120
+
+# "1.", "2)", "2.3 Title", "4.1.2) Title", or any number after Section/Article/Clause; "ARTICLE IV"
+_NUMBERED_RE = re.compile(
+    r"^((?:section|article|clause|sec\.)\s+)?(\d+(?:\.\d+)*)([.)])?(?=\s|$)\s*(.*)$", re.IGNORECASE
+)
+_ROMAN_RE = re.compile(r"^(?:article|section|part|schedule)\s+([IVXLC]+|[A-Z])\b[.:]?\s*(.*)$", re.IGNORECASE)
+# "(a)", "(iv)", "a.", "b)", bullets
+_LIST_RE = re.compile(r"^(\([a-z]{1,4}\)|\(\d{1,2}\)|[a-z][.)]|[-•*▪])\s+(.*)$", re.IGNORECASE)
+# "Term" means / shall mean / refers to / has the meaning
+_DEFINITION_RE = re.compile(
+    r"^[\"“']([^\"”']{1,80})[\"”']\s*(?:\([^)]*\)\s*)?(?:means|shall mean|refers to|has the meaning|includes)\b",
+    re.IGNORECASE,
+)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+")
+
+class Clause:
+    """One node of the clause tree; its text is document[start:end]."""
+
+    __slots__ = ("kind", "label", "title", "level", "start", "end", "children", "parent")
+
+    def __init__(self, kind: str, start: int, end: int, level: int = 0, label: str = "", title: str = "",
+                 parent=None):
+        self.kind = kind
+        self.label = label
+        self.title = title
+        self.level = level
+        self.start = start
+        self.end = end
+        self.children = []
+        self.parent = parent
+
+    def __repr__(self):
+        return f"Clause({self.kind}, {self.label or self.title[:30]!r}, {self.start}-{self.end})"
+
+    @property
+    def path(self) -> str:
+        """Labels from the top of the document down to this clause, e.g. "8 > 8.2 > (b)"."""
+        parts, node = [], self
+        while node is not None and node.kind != "document":
+            name = node.label or node.title
+            if name:
+                parts.append(name[:40])
+            node = node.parent
+        return " > ".join(reversed(parts))
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def leaves(self):
+        return [node for node in self.walk() if not node.children]
+
+
+def _is_heading(line: str) -> bool:
+    """Short all-caps line, or a short title-like line ending in a colon."""
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) < 3 or len(line) > 80:
+        return False
+    if line.isupper() and not line.endswith((".", ";", ",")):
+        return True
+    return line.endswith(":") and len(line.split()) <= 8
+
+
+def _is_section_number(prefix, number: str, close, title: str) -> bool:
+    """
+    Whether a line's leading number really opens a section rather than continuing hard-wrapped text
+    ("30 days of receipt ...", "1.5 percent per month."): a bare integer needs "." or ")" after it,
+    a dotted number a capitalised title, unless Section/Article/Clause precedes either.
+    """
+    if len(number) > 12:
+        return False
+    if prefix:
+        return True
+    if "." in number:
+        return title.lstrip("\"“'(")[:1].isupper()
+    return close is not None and len(number) <= 3
+
+
+def _classify(line: str):
+    """(kind, label, title, depth) for a line that opens a clause, or None for continuation text."""
+    match = _NUMBERED_RE.match(line)
+    if match and _is_section_number(*match.groups()):
+        number = match.group(2)
+        return "section", number, match.group(4).strip(), number.count(".") + 1
+    match = _ROMAN_RE.match(line)
+    if match:
+        return "section", match.group(1), match.group(2).strip(), 1
+    match = _DEFINITION_RE.match(line)
+    if match:
+        return "definition", match.group(1), "", 0
+    match = _LIST_RE.match(line)
+    if match:
+        return "list_item", match.group(1), "", 0
+    if _is_heading(line):
+        return "heading", "", line.rstrip(":"), 1
+    return None
+
+
+def _lines(text: str):
+    """(start, end, stripped line) for every line, offsets covering the stripped content."""
+    offset = 0
+    for raw in text.splitlines(keepends=True):
+        stripped = raw.strip()
+        start = offset + len(raw) - len(raw.lstrip())
+        yield start, start + len(stripped), stripped
+        offset += len(raw)
+
+
+def segment(text: str) -> Clause:
+    """Build the clause tree for a document."""
+    root = Clause("document", 0, len(text))
+    stack = [root]  # open containers (document, sections, headings)
+    leaf = None  # paragraph / list item / definition still collecting lines
+    body = None  # section whose opening line is still running on ("2.1 The Supplier shall ...")
+
+    for start, end, line in _lines(text):
+        if not line:
+            leaf = body = None  # a blank line ends the current block
+            continue
+        found = _classify(line)
+        if found is None:
+            if leaf is not None:
+                leaf.end = end
+            elif body is not None:
+                body.end = end
+            else:
+                leaf = Clause("paragraph", start, end, level=stack[-1].level + 1, parent=stack[-1])
+                stack[-1].children.append(leaf)
+            continue
+
+        kind, label, title, depth = found
+        if kind in ("section", "heading"):
+            # Headings sit at the top level; numbered sections nest by their depth (2.1 under 2)
+            while len(stack) > 1 and stack[-1].level >= depth:
+                stack.pop()
+            node = Clause(kind, start, end, level=depth, label=label, title=title, parent=stack[-1])
+            stack[-1].children.append(node)
+            stack.append(node)
+            leaf, body = None, node
+        else:
+            body = None
+            leaf = Clause(kind, start, end, level=stack[-1].level + 1, label=label, parent=stack[-1])
+            stack[-1].children.append(leaf)
+
+    # Containers span their heading line through their last descendant
+    def _close(node):
+        for child in node.children:
+            _close(child)
+            node.end = max(node.end, child.end)
+    _close(root)
+    root.start, root.end = 0, len(text)
+    return root
+
+
+def _split_long(text: str, start: int, end: int, max_chars: int, first_max: int = None):
+    """
+    Sentence-aligned (start, end) pieces of an oversized clause, each at most max_chars where possible
+    (the first at most first_max, leaving room for a heading that will be prefixed to it).
+    """
+    def limit(pieces):
+        return max_chars if pieces or first_max is None else max(1, first_max)
+
+    bounds = [start] + [m.end() for m in _SENTENCE_END_RE.finditer(text, start, end)] + [end]
+    pieces, piece_start, piece_end = [], start, start
+    for sentence_start, sentence_end in zip(bounds, bounds[1:]):
+        if sentence_end - piece_start > limit(pieces) and piece_end > piece_start:
+            pieces.append((piece_start, piece_end))
+            piece_start = sentence_start
+        piece_end = len(text[:sentence_end].rstrip()) if sentence_end < end else end
+    pieces.append((piece_start, end))
+
+    # A single sentence longer than the limit is cut at word boundaries as a last resort
+    result = []
+    for piece_start, piece_end in pieces:
+        while piece_end - piece_start > limit(result):
+            cut = text.rfind(" ", piece_start, piece_start + limit(result))
+            cut = cut if cut > piece_start else piece_start + limit(result)
+            result.append((piece_start, cut))
+            piece_start = cut + 1
+        if piece_end > piece_start:
+            result.append((piece_start, piece_end))
+    return result
+
+
+def clause_spans(text: str, tree: Clause = None, max_chars: int = CLAUSE_CHUNK_CHARS) -> list:
+    """
+    Non-overlapping (start, end, clause) spans covering the document for RAG chunking: a clause that
+    fits is kept whole, consecutive sibling clauses are merged while they fit (labelled with their
+    parent), and only an oversized clause or section body is split (at sentence boundaries). A
+    section's bare heading line always opens the span of its first clause.
+    """
+    tree = tree or segment(text)
+
+    def _spans(node, lead=0):
+        # lead: characters of enclosing headings that will be prefixed to this node's first span
+        if node.end - node.start + lead <= max_chars:
+            return [(node.start, node.end, node)]
+        if not node.children:
+            pieces = _split_long(text, node.start, node.end, max_chars, max_chars - lead)
+            return [(s, e, node) for s, e in pieces]
+
+        # The container's own text: its heading line and any body before its first clause
+        first, rest = node.children[0], node.children[1:]
+        own_end = node.start + len(text[node.start:first.start].rstrip())
+        if own_end - node.start <= CLAUSE_HEADING_CHARS and "\n" not in text[node.start:own_end]:
+            # A bare heading retrieves badly and its clause reads worse without it
+            child_spans = _spans(first, lead + first.start - node.start)
+            child_spans += [s for child in rest for s in _spans(child)]
+            child_spans[0] = (node.start, child_spans[0][1], child_spans[0][2])
+        else:
+            # A section body of its own is split like a clause; only its first piece carries the lead
+            pieces = _split_long(text, node.start, own_end, max_chars, max_chars - lead)
+            child_spans = [(s, e, node) for s, e in pieces]
+            child_spans += [s for child in node.children for s in _spans(child)]
+
+        spans = []
+        for start, end, clause in child_spans:
+            # The first span also has to leave room for the enclosing headings
+            if spans and end - spans[-1][0] <= max_chars - (lead if len(spans) == 1 else 0):
+                label = spans[-1][2]
+                if clause.parent is label:
+                    # Section body followed by its first clause(s)
+                    spans[-1] = (spans[-1][0], end, label)
+                    continue
+                if clause.parent is label.parent:
+                    spans[-1] = (spans[-1][0], end, clause.parent)
+                    continue
+            spans.append((start, end, clause))
+        return spans
+
+    return [(s, e, c) for s, e, c in _spans(tree) if text[s:e].strip()]
+
+
+def clause_units(text: str, tree: Clause = None) -> list:
+    """
+    Clause texts in document order, together covering every line once (for simplification, which
+    packs neighbouring units up to its token budget but never splits one mid-clause unless it has to).
+    """
+    tree = tree or segment(text)
+    units = []
+    for node in tree.walk():
+        # Leaves contribute their whole text; containers only their own heading/opening text
+        end = node.children[0].start if node.children else node.end
+        unit = text[node.start:end].strip()
+        if unit:
+            units.append(unit)
+    return units
+
+
+# Clause trees by document text hash, so RAG and simplification share the one built for a document
+_TREES = OrderedDict()
+_TREES_MAX = 32
+_TREES_LOCK = threading.Lock()
+
+
+def segment_document(text: str) -> Clause:
+    """segment() cached per document contents."""
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _TREES_LOCK:
+        tree = _TREES.get(key)
+        if tree is not None:
+            _TREES.move_to_end(key)
+            return tree
+    tree = segment(text)
+    with _TREES_LOCK:
+        _TREES[key] = tree
+        while len(_TREES) > _TREES_MAX:
+            _TREES.popitem(last=False)
+    return tree
@@ -0,0 +1,140 @@
+# simplify_cache.py
+# Disk-backed, content-addressed cache for per-chunk simplification output.
+
+import os
+import re
+import hashlib
+import time
+
+from sqlite_cache import SQLiteCache, default_cache_path, shared_instance
+
+SIMPLIFY_CACHE_PATH = os.getenv("SIMPLIFY_CACHE_PATH", default_cache_path("simplify_cache.db"))
+# Size bound for cached output text (0 disables the cache)
+SIMPLIFY_CACHE_MAX_MB = float(os.getenv("SIMPLIFY_CACHE_MAX_MB", "256"))
+
+
+def normalize_chunk(text: str) -> str:
+    """Collapse whitespace so re-extracted copies of the same clause hash identically."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_cache_key(chunk: str, model_id: str, level: str, prompt_version) -> str:
+    """Hash of the normalized chunk plus everything that changes the model output."""
+    payload = "\x1f".join([normalize_chunk(chunk), str(model_id), str(level), str(prompt_version)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SimplificationCache(SQLiteCache):
+    """SQLite-backed LRU cache of simplified chunks, shared by every document and tenant."""
+
+    LABEL = "Simplification cache"
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS simplify_cache (
+            key TEXT PRIMARY KEY,
+            simplified_text TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_simplify_cache_access ON simplify_cache(last_access);",
+    )
+
+    def __init__(self, path: str = SIMPLIFY_CACHE_PATH, max_mb: float = SIMPLIFY_CACHE_MAX_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        super().__init__(path, enabled=self.max_bytes > 0)
+
+    def get_many(self, keys) -> dict:
+        """Return {key: simplified_text} for the keys that are cached, refreshing their LRU stamp."""
+        keys = list(dict.fromkeys(keys))
+        if not self.enabled or not keys:
+            return {}
+
+        found = {}
+        try:
+            conn = self._connect()
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, simplified_text FROM simplify_cache WHERE key IN ({placeholders});", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE simplify_cache SET last_access = ? WHERE key = ?;",
+                    [(now, key) for key in found]
+                )
+                conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Simplification cache read failed: {e}")
+            found = {}
+
+        self._count("hits", len(found))
+        self._count("misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, items: dict):
+        """Store {key: simplified_text} and evict least-recently-used rows beyond the size bound."""
+        if not self.enabled or not items:
+            return
+        now = time.time()
+        rows = [
+            (key, text, len(text.encode("utf-8")), now, now)
+            for key, text in items.items()
+        ]
+        try:
+            conn = self._connect()
+            conn.executemany("""
+                INSERT INTO simplify_cache (key, simplified_text, size_bytes, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    simplified_text = excluded.simplified_text,
+                    size_bytes = excluded.size_bytes,
+                    last_access = excluded.last_access;
+            """, rows)
+            self._evict(conn)
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Simplification cache write failed: {e}")
+
+    def _evict(self, conn):
+        """Internal: drop the oldest entries until the total size fits the budget."""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM simplify_cache;").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in conn.execute("SELECT key, size_bytes FROM simplify_cache ORDER BY last_access ASC;"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM simplify_cache WHERE key = ?;", stale_keys)
+
+    def clear(self):
+        """Remove every cached entry and reset the counters."""
+        if self.enabled:
+            conn = self._connect()
+            conn.execute("DELETE FROM simplify_cache;")
+            conn.commit()
+            conn.close()
+        self._reset_counters()
+
+    def _disk_stats(self, conn) -> dict:
+        entries, size_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM simplify_cache;"
+        ).fetchone()
+        return {
+            "entries": entries,
+            "size_mb": round(size_bytes / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+        }
+
+
+get_simplify_cache = shared_instance(SimplificationCache)
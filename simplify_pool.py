@@ -0,0 +1,98 @@
+# simplify_pool.py
+# Long-lived process pool that runs simplification batches on several CPU cores.
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# Torch threads per worker; 0 = split the machine's cores evenly between workers
+SIMPLIFY_WORKER_THREADS = int(os.getenv("SIMPLIFY_WORKER_THREADS", "0"))
+
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _threads_per_worker(workers: int) -> int:
+    if SIMPLIFY_WORKER_THREADS > 0:
+        return SIMPLIFY_WORKER_THREADS
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _init_worker(num_threads: int):
+    """Runs once in every worker: cap intra-op threads so workers don't oversubscribe the CPU."""
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    os.environ["MKL_NUM_THREADS"] = str(num_threads)
+    import torch
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+
+
+def _simplify_batch_in_worker(model_choice: str, jobs, precision: str = None):
+    """Worker task: each process keeps its own model in its model registry between calls."""
+    import models
+    pipe = models.get_simplify_pipeline(model_choice, precision)
+    if isinstance(pipe, str):
+        print(f"⚠️ Worker {os.getpid()} could not load {model_choice}: {pipe}")
+        return [None] * len(jobs)
+    return models._run_simplify_batch(pipe, jobs)
+
+
+def get_simplify_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared pool, starting it (or resizing it) only when needed."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None and _POOL_WORKERS == workers:
+            return _POOL
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+
+        # 'spawn' avoids forking a parent that already has torch threads running
+        _POOL = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(_threads_per_worker(workers),),
+        )
+        _POOL_WORKERS = workers
+        print(f"🚀 Started simplification pool: {workers} workers x {_threads_per_worker(workers)} threads")
+        return _POOL
+
+
+def shutdown_simplify_pool():
+    """Stop the shared pool (the next call to get_simplify_pool starts a fresh one)."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+        _POOL_WORKERS = 0
+
+
+def run_batches_in_pool(model_choice: str, batches, workers: int, precision: str = None):
+    """
+    Shard batches across the pool and yield (batch, outputs) as each one completes.
+    Outputs follow models._run_simplify_batch (None marks a failed chunk).
+    """
+    if not batches:
+        return
+    pool = get_simplify_pool(workers)
+    futures = {
+        pool.submit(_simplify_batch_in_worker, model_choice, batch, precision): batch
+        for batch in batches
+    }
+
+    for future in as_completed(futures):
+        batch = futures[future]
+        try:
+            yield batch, future.result()
+        except BrokenProcessPool as e:
+            # A worker died (usually OOM); drop the pool so the next document gets a fresh one
+            print(f"❌ Simplification pool broke: {e}")
+            shutdown_simplify_pool()
+            yield batch, [None] * len(batch)
+        except Exception as e:
+            print(f"Error processing batch of {len(batch)} chunks in pool: {e}")
+            yield batch, [None] * len(batch)
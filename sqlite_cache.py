@@ -0,0 +1,100 @@
+# sqlite_cache.py
+# Shared scaffolding for the app's SQLite-backed caches (simplification, answers, embeddings):
+# default file location, per-call connections, schema setup, hit counters, stats and the
+# process-wide instance. Each cache module keeps only its own schema and lookup logic.
+
+import os
+import sqlite3
+import threading
+
+
+def default_cache_path(name: str) -> str:
+    """Where a cache lives unless its env var says otherwise: next to models_cache/ in the working directory."""
+    return os.path.abspath(name)
+
+
+class SQLiteCache:
+    """
+    Base class: subclasses set LABEL, SCHEMA (CREATE statements run at startup) and COUNTERS (the
+    per-process counters reported by stats(); every name except "misses" counts as a hit), and
+    override _disk_stats() to report entry counts and sizes.
+    """
+
+    LABEL = "Cache"
+    SCHEMA = ()
+    COUNTERS = ("hits", "misses")
+
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self._lock = threading.RLock()
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+        if self.enabled:
+            self._init_db()
+
+    def _connect(self):
+        """Internal: one short-lived connection per call (Streamlit sessions run in threads)."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode = WAL;")
+        return conn
+
+    def _init_db(self):
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = self._connect()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def _count(self, counter: str, n: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def _reset_counters(self):
+        with self._lock:
+            for counter in self.COUNTERS:
+                setattr(self, counter, 0)
+
+    def _disk_stats(self, conn) -> dict:
+        """Internal: on-disk figures (entries, size) for stats()."""
+        return {}
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus what _disk_stats() reports."""
+        disk = {}
+        if self.enabled:
+            try:
+                conn = self._connect()
+                disk = self._disk_stats(conn)
+                conn.close()
+            except Exception as e:
+                print(f"⚠️ {self.LABEL} stats failed: {e}")
+        with self._lock:
+            counters = {counter: getattr(self, counter) for counter in self.COUNTERS}
+        lookups = sum(counters.values())
+        hits = lookups - counters.get("misses", 0)
+        return {
+            "enabled": self.enabled,
+            **disk,
+            **counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def shared_instance(factory):
+    """get_x() returning one process-wide factory() instance, created on first call from any thread."""
+    instance = []
+    lock = threading.Lock()
+
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    get.__doc__ = f"Process-wide {getattr(factory, '__name__', 'cache')} instance (safe from any session thread)."
+    return get
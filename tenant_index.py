@@ -0,0 +1,209 @@
+# tenant_index.py
+# One approximate nearest-neighbour (HNSW) index per tenant over the chunks of every saved document.
+# Vectors live in <tenant>_indexes/tenant.hnsw; chunk text and offsets live in the tenant DB's
+# document_chunks table, whose row ids are the vector ids.
+
+import os
+import threading
+
+from db import save_document_chunks, get_document_chunks, get_chunk_ids_for_documents
+from rag_index import tenant_index_root
+from embedding_cache import _file_lock
+
+# HNSW graph degree and search breadth
+TENANT_INDEX_HNSW_M = int(os.getenv("TENANT_INDEX_HNSW_M", "32"))
+TENANT_INDEX_EF_SEARCH = int(os.getenv("TENANT_INDEX_EF_SEARCH", "64"))
+# Candidates fetched per requested result when a filter has to be applied after the search
+TENANT_INDEX_OVERSAMPLE = int(os.getenv("TENANT_INDEX_OVERSAMPLE", "8"))
+
+# tenant_db -> (file version, faiss index). Cached indexes are never modified: add_document builds
+# a new one and swaps it in, so searches can read theirs without a lock.
+_INDEXES = {}
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def tenant_index_path(tenant_db: str) -> str:
+    return os.path.join(tenant_index_root(tenant_db), "tenant.hnsw")
+
+
+def _locked(tenant_db: str):
+    """Cross-process lock for load + add + save (app replicas share the tenant's index file)."""
+    root = tenant_index_root(tenant_db)
+    os.makedirs(root, exist_ok=True)
+    return _file_lock(os.path.join(root, "tenant.lock"))
+
+
+def _lock_for(tenant_db: str) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(os.path.abspath(tenant_db), threading.Lock())
+
+
+def _new_index(dim: int):
+    import faiss
+    index = faiss.IndexHNSWFlat(dim, TENANT_INDEX_HNSW_M)
+    index.hnsw.efSearch = TENANT_INDEX_EF_SEARCH
+    # IDMap2 lets vector ids be document_chunks row ids
+    return faiss.IndexIDMap2(index)
+
+
+def _file_version(path: str):
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _load(tenant_db: str, fresh: bool = False):
+    """
+    The tenant's index from disk (cached per process until the file changes), or None.
+    fresh: read a private copy that the caller may modify (the cached one is shared by searches).
+    """
+    import faiss
+    path = tenant_index_path(tenant_db)
+    if not os.path.exists(path):
+        return None
+    version = _file_version(path)
+    cached = _INDEXES.get(tenant_db)
+    if cached and cached[0] == version and not fresh:
+        return cached[1]
+    index = faiss.read_index(path)
+    faiss.downcast_index(index.index).hnsw.efSearch = TENANT_INDEX_EF_SEARCH
+    if not fresh:
+        _INDEXES[tenant_db] = (version, index)
+    return index
+
+
+def _save(tenant_db: str, index):
+    """Write the index and make it the cached one (callers hold _locked and stop modifying it)."""
+    import faiss
+    path = tenant_index_path(tenant_db)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+    _INDEXES[tenant_db] = (_file_version(path), index)
+
+
+def _chunk_offsets(text: str, chunks):
+    """(chunk_index, start, end, text) per chunk, using the splitter's start_index when it recorded one."""
+    rows, cursor = [], 0
+    for i, chunk in enumerate(chunks):
+        content = chunk.page_content
+        start = chunk.metadata.get("start_index", -1) if chunk.metadata else -1
+        if start is None or start < 0:
+            start = text.find(content, cursor)
+            if start < 0:
+                start = text.find(content)
+        if start >= 0:
+            cursor = start + 1
+        rows.append((i, max(start, 0), max(start, 0) + len(content), content))
+    return rows
+
+
+def add_document(tenant_db: str, document_id: int, text: str, vectorstore=None) -> int:
+    """
+    Add (or replace) one document's chunks in the tenant index; returns the number of chunks indexed.
+    With the document's own FAISS vectorstore its vectors are reused; otherwise the text is split and embedded.
+    Replaced chunks stay in the graph until rebuild() but are never returned (their metadata rows are gone).
+    """
+    import numpy as np
+
+    if vectorstore is not None:
+        chunks = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[row])
+                  for row in range(vectorstore.index.ntotal)]
+        vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    else:
+        import models
+        from embedding_service import get_embedding_service
+        chunks = models.split_document(text)
+        vectors = get_embedding_service().embed_documents([c.page_content for c in chunks])
+    if not chunks:
+        return 0
+    vectors = np.asarray(vectors, dtype="float32")
+
+    with _lock_for(tenant_db), _locked(tenant_db):
+        ids = save_document_chunks(tenant_db, document_id, _chunk_offsets(text, chunks))
+        # A private copy read under the file lock: includes other replicas' additions, and the
+        # index searches are reading is never written to
+        index = _load(tenant_db, fresh=True)
+        if index is None:
+            index = _new_index(vectors.shape[1])
+        index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+        _save(tenant_db, index)
+    return len(ids)
+
+
+def search(tenant_db: str, query: str, k: int = 5, document_ids=None) -> list:
+    """
+    Top-k chunks for a query across the tenant's documents (optionally only document_ids).
+    Each hit: {document_id, chunk_index, start_offset, end_offset, text, score} (lower score = closer).
+    """
+    import faiss
+    import numpy as np
+    from embedding_service import get_embedding_service
+
+    index = _load(tenant_db)
+    if index is None or index.ntotal == 0:
+        return []
+
+    query_vector = np.asarray([get_embedding_service().embed_query(query)], dtype="float32")
+    allowed = None
+    params = None
+    if document_ids:
+        allowed = set(get_chunk_ids_for_documents(tenant_db, document_ids))
+        if not allowed:
+            return []
+        try:
+            params = faiss.SearchParametersHNSW(
+                sel=faiss.IDSelectorBatch(np.asarray(sorted(allowed), dtype="int64")),
+                efSearch=max(TENANT_INDEX_EF_SEARCH, k),
+            )
+        except Exception:
+            params = None  # Older FAISS without search-time selectors: filter after the search
+
+    fetch = k if params is not None else k * TENANT_INDEX_OVERSAMPLE
+    # Extra candidates cover chunks replaced since the last rebuild
+    fetch = min(index.ntotal, fetch + k)
+    try:
+        distances, ids = index.search(query_vector, fetch, params=params)
+    except TypeError:
+        # FAISS builds whose search() takes no params: oversample and filter below
+        distances, ids = index.search(query_vector, min(index.ntotal, k * TENANT_INDEX_OVERSAMPLE + k))
+
+    candidates = [(int(i), float(d)) for i, d in zip(ids[0], distances[0]) if i >= 0]
+    if allowed is not None:
+        candidates = [(i, d) for i, d in candidates if i in allowed]
+    rows = get_document_chunks(tenant_db, [i for i, _ in candidates])
+
+    hits = []
+    for chunk_id, distance in candidates:
+        row = rows.get(chunk_id)
+        if row is None:
+            continue  # Replaced chunk
+        hits.append({
+            "document_id": row["document_id"],
+            "chunk_index": row["chunk_index"],
+            "start_offset": row["start_offset"],
+            "end_offset": row["end_offset"],
+            "text": row["text"],
+            "score": distance,
+        })
+        if len(hits) >= k:
+            break
+    return hits
+
+
+def rebuild(tenant_db: str) -> int:
+    """Re-index every document in the tenant DB from scratch (backfill and compaction); returns chunks indexed."""
+    from db import get_all_documents
+
+    with _lock_for(tenant_db), _locked(tenant_db):
+        path = tenant_index_path(tenant_db)
+        if os.path.exists(path):
+            os.remove(path)
+        _INDEXES.pop(tenant_db, None)
+
+    total = 0
+    for doc in get_all_documents(tenant_db).to_dict("records"):
+        if doc.get("original_text"):
+            total += add_document(tenant_db, doc["id"], doc["original_text"])
+    return total
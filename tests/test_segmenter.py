@@ -0,0 +1,77 @@
+import unittest
+
+from segmenter import CLAUSE_CHUNK_CHARS, clause_spans, clause_units, segment
+
+BODY = " ".join(
+    f"The Supplier shall perform obligation number {i} with reasonable care and skill." for i in range(25)
+)
+CONTRACT = f"""MASTER SERVICES AGREEMENT
+
+1. Parties
+This Agreement is made between Acme Ltd and Beta LLC.
+
+2. Services
+2.1 Scope of Services
+{BODY}
+(a) The Supplier shall deliver monthly reports.
+(b) The Supplier shall attend quarterly reviews.
+"""
+
+WRAPPED = """4. Payment
+4.1 Invoices
+The Customer shall pay each undisputed invoice within
+30 days of receipt. Late amounts accrue interest at
+1.5 percent per month.
+4.2 Disputes
+Disputed amounts are resolved under Section 9.
+"""
+
+
+def _sections(tree):
+    return [node.label for node in tree.walk() if node.kind == "section"]
+
+
+class ClauseSpanTests(unittest.TestCase):
+    def test_long_section_body_is_split_before_its_clauses(self):
+        spans = clause_spans(CONTRACT)
+        self.assertTrue(all(end - start <= CLAUSE_CHUNK_CHARS for start, end, _ in spans))
+        # The body was split, and (a)/(b) still get a span of their own
+        body_spans = [c for s, e, c in spans if c.label == "2.1"]
+        self.assertGreater(len(body_spans), 1)
+        self.assertTrue(any("monthly reports" in CONTRACT[s:e] for s, e, _ in spans))
+
+    def test_bare_heading_opens_first_clause_span(self):
+        spans = clause_spans(CONTRACT)
+        first = CONTRACT[spans[0][0]:spans[0][1]]
+        self.assertTrue(first.startswith("MASTER SERVICES AGREEMENT"))
+        self.assertIn("Acme Ltd", first)
+        self.assertTrue(all(CONTRACT[s:e].strip() != "2. Services" for s, e, _ in spans))
+
+    def test_merged_siblings_are_labelled_with_their_parent(self):
+        spans = clause_spans(CONTRACT)
+        merged = [c for s, e, c in spans if "monthly reports" in CONTRACT[s:e]][0]
+        self.assertEqual(merged.path, "2 > 2.1")
+        # Title and section 1 share only the document itself
+        self.assertEqual(spans[0][2].kind, "document")
+
+    def test_spans_cover_all_text(self):
+        spans = clause_spans(CONTRACT)
+        covered = "".join(CONTRACT[s:e] for s, e, _ in spans)
+        self.assertEqual("".join(covered.split()), "".join(CONTRACT.split()))
+        self.assertEqual("".join("".join(clause_units(CONTRACT)).split()), "".join(CONTRACT.split()))
+
+
+class NumberingTests(unittest.TestCase):
+    def test_wrapped_numbers_continue_the_paragraph(self):
+        tree = segment(WRAPPED)
+        self.assertEqual(_sections(tree), ["4", "4.1", "4.2"])
+        invoices = [node for node in tree.walk() if node.label == "4.1"][0]
+        self.assertIn("1.5 percent per month.", WRAPPED[invoices.start:invoices.end])
+
+    def test_prefixed_and_closed_numbers_open_sections(self):
+        tree = segment("Section 12 General\nText.\n\n3) Notices\nText.\n\n7.2 Governing Law\nText.\n")
+        self.assertEqual(_sections(tree), ["12", "3", "7.2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -81,6 +81,76 @@ def show_page(admin_selection_display):
         except Exception as e: 
             st.write(f"Error loading users: {e}")
 
+    # --- Admin: Model Status ---
+    elif admin_selection_display == "Model Status":
+        st.header("Model Readiness")
+        from warmup import model_status, warmup_summary, format_status
+        from model_registry import REGISTRY
+
+        summary = warmup_summary()
+        if summary["running"]:
+            st.info(f"Warm-up in progress: {summary['current'] or '-'} (queued: {', '.join(summary['pending']) or 'none'})")
+        elif summary["finished_at"]:
+            st.success(f"Warm-up finished in {summary['finished_at'] - summary['started_at']:.1f}s")
+        else:
+            st.caption("Warm-up is disabled (WARMUP_MODELS is empty).")
+
+        for row in model_status():
+            st.write(format_status(row))
+            if row["state"] == "failed":
+                st.caption(f"Error: {row.get('error', 'unknown')}")
+
+        st.subheader("Loaded Checkpoints")
+        loaded = REGISTRY.stats()
+        if loaded:
+            st.dataframe(pd.DataFrame(loaded), use_container_width=True)
+            st.caption(f"Resident: {REGISTRY.resident_bytes() / (1024 * 1024):.0f} MB")
+        else:
+            st.info("No models loaded in this process yet.")
+
+        from embedding_service import get_embedding_service
+        st.subheader("Embedding Service")
+        st.json(get_embedding_service().stats())
+
+        from inference_scheduler import get_inference_scheduler
+        st.subheader("Inference Scheduler")
+        st.json(get_inference_scheduler().stats())
+
+        from model_server import get_model_client
+        client = get_model_client()
+        if client is not None:
+            st.subheader("Model Server")
+            st.caption(f"Models are hosted by {client.url}; the tables above only cover this process.")
+            try:
+                st.json(client.health())
+            except Exception as e:
+                st.error(f"Model server unreachable: {e}")
+
+        try:
+            from simplify_cache import get_simplify_cache
+            st.subheader("Simplification Cache")
+            st.json(get_simplify_cache().stats())
+        except Exception as e:
+            st.caption(f"Simplification cache unavailable: {e}")
+
+        try:
+            from answer_cache import get_answer_cache
+            st.subheader("Answer Cache")
+            st.json(get_answer_cache().stats())
+        except Exception as e:
+            st.caption(f"Answer cache unavailable: {e}")
+
+        try:
+            from embedding_cache import get_embedding_cache
+            st.subheader("Embedding Cache")
+            embedding_cache = get_embedding_cache()
+            st.json(embedding_cache.stats())
+            if st.button("Compact Embedding Cache", key="compact_embedding_cache"):
+                kept = embedding_cache.compact()
+                st.success(f"Compacted: {kept} vectors kept.")
+        except Exception as e:
+            st.caption(f"Embedding cache unavailable: {e}")
+
     # --- Admin: Tenant DB Inspector ---
     elif admin_selection_display == "Tenant DB Inspector":
         st.header("Tenant Database Inspector")
@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 import pandas as pd
 import altair as alt
@@ -5,6 +6,46 @@ from db import get_glossary_terms
 # --- FIX: Added missing imports ---
 from readability import highlight_legal_terms, analyze_readability, color_code_complexity
 
+def render_simplified_stream(chunk_iter, glossary_terms=None, total_chars=None, refresh_seconds=0.5):
+    """
+    Renders the simplified column progressively while chunks arrive from
+    models.simplify_text_iter. Returns the simplified chunks in document order.
+    """
+    glossary_terms = glossary_terms or {}
+    progress_bar = st.progress(0.0, text="Simplifying...")
+    viewer = st.empty()
+
+    finished = {}
+    done_chars = 0
+    last_render = 0.0
+
+    def _render():
+        preview = " ".join(finished[i] for i in sorted(finished))
+        try:
+            body = highlight_legal_terms(preview, glossary_terms)
+        except Exception:
+            body = preview
+        viewer.markdown(f'<div class="doc-viewer" style="background-color: #F8FBFB;">{body}</div>', unsafe_allow_html=True)
+
+    for index, original, simplified in chunk_iter:
+        finished[index] = simplified
+        done_chars += len(original)
+        if total_chars:
+            pct = min(1.0, done_chars / total_chars)
+            progress_bar.progress(pct, text=f"Simplifying... {int(pct * 100)}%")
+        else:
+            progress_bar.progress(0.0, text=f"Simplifying... {len(finished)} chunks done")
+
+        # Re-rendering the highlighted column on every chunk is wasteful; throttle it
+        if time.time() - last_render >= refresh_seconds:
+            _render()
+            last_render = time.time()
+
+    _render()
+    progress_bar.progress(1.0, text="Simplification complete")
+    return [finished[i] for i in sorted(finished)]
+
+
 def show_page(tenant_db, tenant_user_id):
     """
     Renders the "Legal Assistant" comparison and analysis page.
@@ -61,6 +102,18 @@ def show_page(tenant_db, tenant_user_id):
                     # Fallback to plain text
                     st.markdown(f'<div class="doc-viewer" style="background-color: #F8FBFB; white-space: pre-wrap;">{simplified_text}</div>', unsafe_allow_html=True) 
                 # --- END FIX ---
+
+                # How the latency budget shaped decoding (relaxed strategies trade quality for speed)
+                decoding_report = st.session_state.get("decoding_report")
+                if decoding_report and decoding_report.get("strategy_counts"):
+                    counts = ", ".join(
+                        f"{count} chunk(s) {name}" for name, count in decoding_report["strategy_counts"].items()
+                    )
+                    budget = decoding_report.get("latency_budget")
+                    budget_note = f" within a {budget:.0f}s budget" if budget else ""
+                    st.caption(f"Decoding: {counts}{budget_note} ({decoding_report['elapsed_seconds']}s)")
+                    with st.expander("Decoding decisions per chunk"):
+                        st.dataframe(decoding_report["decisions"], use_container_width=True)
         else:
             st.markdown('<div class="doc-viewer" style="background-color: #F8FBFB;">No simplified text available.</div>', unsafe_allow_html=True)
 
@@ -4,6 +4,7 @@ import time
 import json
 import re
 from datetime import datetime
+from precompute import SUGGESTED_QUESTIONS, interactive_query, get_answer as get_precomputed_answer
 
 # Safe imports with fallbacks
 try:
@@ -41,29 +42,13 @@ class AdvancedChatProcessor:
         self.conversation_context = []
         
     def analyze_query_intent(self, query: str):
-        """Advanced query intent analysis."""
+        """Topic tags for a query, from its embedding's similarity to query_router's topic centroids."""
         try:
-            query_lower = query.lower()
-            
-            # Intent classification
-            intents = {
-                'summary': any(word in query_lower for word in ['summary', 'overview', 'main purpose', 'what is this']),
-                'obligation': any(word in query_lower for word in ['obligation', 'responsibilit', 'must', 'shall', 'required']),
-                'termination': any(word in query_lower for word in ['terminat', 'end', 'cancel', 'expire']),
-                'confidentiality': any(word in query_lower for word in ['confidential', 'secret', 'nda']),
-                'financial': any(word in query_lower for word in ['payment', 'fee', 'cost', 'price', 'amount']),
-                'legal': any(word in query_lower for word in ['law', 'jurisdiction', 'govern']),
-                'timeline': any(word in query_lower for word in ['date', 'deadline', 'timeline', 'when']),
-            }
-            
-            primary_intent = max(intents, key=intents.get) if any(intents.values()) else 'general'
-            
-            return {
-                'primary_intent': primary_intent,
-                'detected_intents': [intent for intent, detected in intents.items() if detected],
-            }
+            from query_router import get_query_router
+            rag_chain = st.session_state.get('rag_chain')
+            return get_query_router().topics(query, embed=getattr(rag_chain, 'embed_question', None))
         except Exception:
-            return {'primary_intent': 'general', 'detected_intents': ['general']}
+            return {'primary_intent': 'general', 'detected_intents': ['general'], 'confidence': 0.0}
 
 def initialize_session_state():
     """Initialize all session state variables safely."""
@@ -77,7 +62,9 @@ def initialize_session_state():
         'chat_history': [],
         'chat_analysis': {
             'total_questions': 0,
-            'avg_response_time': 0,
+            'timed_answers': 0,
+            'avg_ttft': 0,
+            'avg_generation_time': 0,
             'last_active': None
         },
         'model_ready': st.session_state.get('model_ready', False),
@@ -110,6 +97,12 @@ def show_page(tenant_db, tenant_user_id):
         show_welcome_state()
         return
 
+    # Resumed session: restore the RAG chain from the document's saved index
+    if not st.session_state.rag_chain:
+        from processing import ensure_rag_chain
+        with st.spinner("Restoring document index..."):
+            ensure_rag_chain(tenant_db)
+
     # Check document status
     document_status = check_document_status()
     if document_status != "ready":
@@ -191,20 +184,8 @@ def initialize_chat_history(tenant_db, tenant_user_id):
 def generate_intelligent_suggestions():
     """Generate intelligent suggested questions."""
     try:
-        base_questions = [
-            "Provide a comprehensive summary of this document",
-            "What are the main obligations and responsibilities?",
-            "Explain the termination conditions and procedures",
-            "What confidentiality requirements are specified?",
-            "Detail the payment terms and financial provisions",
-            "What governing law and jurisdiction apply?",
-            "Are there any liability limitations or warranties?",
-            "What are the key dates, deadlines and timelines?",
-            "Who are the parties involved and their roles?",
-            "What are the key deliverables and milestones?"
-        ]
-        
-        st.session_state.suggested_questions = base_questions
+        # Shared with the background precomputation started after processing
+        st.session_state.suggested_questions = list(SUGGESTED_QUESTIONS)
         
     except Exception:
         st.session_state.suggested_questions = [
@@ -232,8 +213,9 @@ def show_chat_header():
         st.metric("Questions", total_questions)
     
     with col3:
-        avg_time = st.session_state.chat_analysis['avg_response_time']
-        st.metric("Response Time", f"{avg_time:.1f}s")
+        avg_ttft = st.session_state.chat_analysis.get('avg_ttft', 0)
+        avg_generation = st.session_state.chat_analysis.get('avg_generation_time', 0)
+        st.metric("First Token", f"{avg_ttft:.1f}s", help=f"Average full answer: {avg_generation:.1f}s")
     
     # Debug info (collapsible)
     with st.expander("🔧 Debug Information"):
@@ -241,6 +223,15 @@ def show_chat_header():
         st.write(f"Text length: {len(st.session_state.current_text) if st.session_state.current_text else 0} chars")
         st.write(f"RAG Chain: {'Available' if st.session_state.rag_chain else 'Not available'}")
         st.write(f"Model Ready: {st.session_state.model_ready}")
+        pack_report = st.session_state.chat_analysis.get('last_pack_report')
+        if pack_report:
+            st.write(
+                f"Last prompt: {pack_report['prompt_tokens']}/{pack_report['limit']} tokens "
+                f"(context {pack_report['context_tokens']}, history {pack_report['history_tokens']}, "
+                f"question {pack_report['question_tokens']}; "
+                f"{pack_report['chunks_used']} chunks used, {pack_report['chunks_dropped']} dropped, "
+                f"{pack_report['chunks_trimmed']} trimmed)"
+            )
 
 def display_chat_history():
     """Display the chat history."""
@@ -274,17 +265,18 @@ def show_smart_suggestions():
                 use_container_width=True,
                 help="Click to ask this question"
             ):
-                process_query(question)
+                # Answered below the suggestions (where typed questions stream) on the next run
+                st.session_state.pending_query = question
                 st.rerun()
 
 def handle_chat_input(tenant_db, tenant_user_id):
     """Handle chat input."""
-    prompt = st.chat_input("Ask a question about the document...")
+    prompt = st.chat_input("Ask a question about the document...") or st.session_state.pop('pending_query', None)
     if prompt:
         process_query(prompt)
 
 def process_query(query):
-    """Process any query."""
+    """Process any query, streaming the answer into the chat as it is generated."""
     # Add user message to history
     st.session_state.chat_history.append(("user", query))
     
@@ -292,25 +284,44 @@ def process_query(query):
     st.session_state.chat_analysis['total_questions'] += 1
     st.session_state.chat_analysis['last_active'] = datetime.now().strftime("%Y-%m-%d %H:%M")
     
+    with st.chat_message("user"):
+        st.markdown(query)
+    
     # Generate bot response
-    with st.spinner("🔍 Analyzing document..."):
+    with st.chat_message("bot"):
+        placeholder = st.empty()
+        rag_chain = st.session_state.rag_chain
+        if hasattr(rag_chain, 'last_pack_report'):
+            rag_chain.last_pack_report = None
+        
         start_time = time.time()
+        timing = {'first_token': None}
         
-        # Get response
-        answer = get_bot_response(query)
-        response_time = time.time() - start_time
+        def timed(stream):
+            for piece in stream:
+                if timing['first_token'] is None:
+                    timing['first_token'] = time.time() - start_time
+                yield piece
         
-        # Update average response time
-        current_avg = st.session_state.chat_analysis['avg_response_time']
-        total_questions = st.session_state.chat_analysis['total_questions']
-        if total_questions > 1:
-            new_avg = ((current_avg * (total_questions - 1)) + response_time) / total_questions
-        else:
-            new_avg = response_time
-        st.session_state.chat_analysis['avg_response_time'] = new_avg
+        # Background precomputation pauses until the answer is done
+        with interactive_query():
+            with placeholder.container():
+                streamed = st.write_stream(timed(stream_bot_response(query)))
+            answer = streamed if isinstance(streamed, str) else "".join(str(part) for part in streamed)
+            generation_time = time.time() - start_time
+            
+            # Answers that turned out to be errors or "not in the document" are replaced in place
+            final_answer = finalize_response(query, answer)
+            if final_answer != answer:
+                placeholder.markdown(final_answer)
+        
+        record_timing(timing['first_token'] or generation_time, generation_time)
+        
+        # Prompt tokens packed for this answer (None when it came from a cache or a fallback)
+        st.session_state.chat_analysis['last_pack_report'] = getattr(rag_chain, 'last_pack_report', None)
         
         # Add bot response to history
-        st.session_state.chat_history.append(("bot", answer))
+        st.session_state.chat_history.append(("bot", final_answer))
     
     # Trim history if too long
     if len(st.session_state.chat_history) > 30:
@@ -327,32 +338,71 @@ def process_query(query):
     except Exception:
         pass
 
-def get_bot_response(query):
-    """Get response from available systems."""
+def record_timing(time_to_first_token, generation_time):
+    """Update the latest and running-average time-to-first-token and total generation time."""
+    analysis = st.session_state.chat_analysis
+    answers = analysis.get('timed_answers', 0) + 1
+    analysis['timed_answers'] = answers
+    analysis['last_ttft'] = time_to_first_token
+    analysis['last_generation_time'] = generation_time
+    analysis['avg_ttft'] = analysis.get('avg_ttft', 0) + (time_to_first_token - analysis.get('avg_ttft', 0)) / answers
+    analysis['avg_generation_time'] = (
+        analysis.get('avg_generation_time', 0) + (generation_time - analysis.get('avg_generation_time', 0)) / answers
+    )
+
+def stream_bot_response(query):
+    """Yield the response from available systems (RAG answers token by token, everything else whole)."""
     try:
         # If we have document text but no RAG, provide basic analysis
         document_text = st.session_state.get('current_text', '')
         
         if not document_text:
-            return "❌ No document content available. Please make sure your document was processed correctly."
+            yield "❌ No document content available. Please make sure your document was processed correctly."
+            return
+        
+        # Suggested questions answered in the background after processing return instantly
+        response = get_precomputed_answer(
+            st.session_state.get('tenant_db'), st.session_state.get('current_document_id'), query
+        )
+        if response is not None:
+            yield response
+            return
         
-        # Try RAG system first
+        # Otherwise try the RAG system
         if st.session_state.rag_chain:
-            if hasattr(models, 'handle_user_query') and callable(models.handle_user_query):
-                response = models.handle_user_query(
+            if hasattr(models, 'stream_user_query') and callable(models.stream_user_query):
+                yield from models.stream_user_query(
+                    st.session_state.rag_chain, 
+                    query, 
+                    st.session_state.simplification_model
+                )
+            elif hasattr(models, 'handle_user_query') and callable(models.handle_user_query):
+                yield models.handle_user_query(
                     st.session_state.rag_chain, 
                     query, 
                     st.session_state.simplification_model
                 )
             elif hasattr(models, 'query_rag_chain') and callable(models.query_rag_chain):
-                response = models.query_rag_chain(st.session_state.rag_chain, query)
+                yield models.query_rag_chain(st.session_state.rag_chain, query)
             else:
-                response = "RAG system available but query methods not found."
+                yield "RAG system available but query methods not found."
         else:
-            response = "RAG system not available."
+            yield "RAG system not available."
+        
+    except Exception as e:
+        yield f"❌ Error processing your question: {str(e)}"
+
+def finalize_response(query, response):
+    """Swap an unusable response for the RAG fallback or, failing that, a document-based response."""
+    try:
+        if st.session_state.rag_chain and hasattr(models, 'fallback_answer'):
+            response = models.fallback_answer(
+                st.session_state.rag_chain, query, response, st.session_state.simplification_model
+            ) or response
         
         # If RAG didn't work or returned generic response, provide document-based response
-        if not response or "not in the document" in response.lower() or "sorry" in response.lower():
+        document_text = st.session_state.get('current_text', '')
+        if document_text and (not response or "not in the document" in response.lower() or "sorry" in response.lower()):
             response = generate_document_based_response(query, document_text)
         
         return response
@@ -363,23 +413,21 @@ def get_bot_response(query):
 def generate_document_based_response(query, document_text):
     """Generate response based on document content when RAG fails."""
     query_lower = query.lower()
-    doc_lower = document_text.lower()
+    # BM25 sentence index built once per document (shared with the RAG chain from processing)
+    from bm25 import sentence_index_for
+    sentence_index = sentence_index_for(document_text)
     
     # Simple pattern matching for common questions
     if "summary" in query_lower or "overview" in query_lower:
         # Extract first few sentences as summary
-        sentences = document_text.split('.')
-        summary = '. '.join(sentences[:3]) + '.' if len(sentences) > 3 else document_text
+        sentences = sentence_index.passages
+        summary = ' '.join(sentences[:3]) if len(sentences) > 3 else document_text
         return f"📋 **Document Summary:**\n\n{summary}\n\n*This is an automated summary based on document content.*"
     
     elif "obligation" in query_lower or "responsibilit" in query_lower:
         # Look for obligation-related content
-        obligation_terms = ['shall', 'must', 'will', 'agree to', 'responsible', 'obligation', 'duty']
-        found_obligations = []
-        
-        for sentence in document_text.split('.'):
-            if any(term in sentence.lower() for term in obligation_terms):
-                found_obligations.append(sentence.strip())
+        obligation_terms = ['shall', 'must', 'will', 'agree', 'responsible', 'responsibility', 'obligation', 'duty']
+        found_obligations = sentence_index.top_sentences(' '.join(obligation_terms), k=5, document_order=True)
         
         if found_obligations:
             obligations_text = '\n• '.join(found_obligations[:5])
@@ -388,12 +436,8 @@ def generate_document_based_response(query, document_text):
             return "🤔 No specific obligations were explicitly mentioned in the document text."
     
     elif "terminat" in query_lower:
-        termination_terms = ['terminat', 'end', 'expir', 'cancel']
-        found_termination = []
-        
-        for sentence in document_text.split('.'):
-            if any(term in sentence.lower() for term in termination_terms):
-                found_termination.append(sentence.strip())
+        termination_terms = ['terminate', 'termination', 'end', 'expire', 'expiration', 'cancel']
+        found_termination = sentence_index.top_sentences(' '.join(termination_terms), k=5, document_order=True)
         
         if found_termination:
             termination_text = '\n• '.join(found_termination[:5])
@@ -402,12 +446,8 @@ def generate_document_based_response(query, document_text):
             return "🤔 No specific termination clauses were found in the document text."
     
     elif "confidential" in query_lower:
-        confidential_terms = ['confidential', 'secret', 'proprietary', 'non-disclosure']
-        found_confidential = []
-        
-        for sentence in document_text.split('.'):
-            if any(term in sentence.lower() for term in confidential_terms):
-                found_confidential.append(sentence.strip())
+        confidential_terms = ['confidential', 'confidentiality', 'secret', 'proprietary', 'non-disclosure']
+        found_confidential = sentence_index.top_sentences(' '.join(confidential_terms), k=5, document_order=True)
         
         if found_confidential:
             confidential_text = '\n• '.join(found_confidential[:5])
@@ -416,12 +456,8 @@ def generate_document_based_response(query, document_text):
             return "🤔 No specific confidentiality clauses were found in the document text."
     
     elif "payment" in query_lower or "fee" in query_lower:
-        payment_terms = ['payment', 'fee', 'price', 'amount', '$', 'usd', 'payment term']
-        found_payment = []
-        
-        for sentence in document_text.split('.'):
-            if any(term in sentence.lower() for term in payment_terms):
-                found_payment.append(sentence.strip())
+        payment_terms = ['payment', 'pay', 'fee', 'price', 'amount', 'usd', 'invoice']
+        found_payment = sentence_index.top_sentences(' '.join(payment_terms), k=5, document_order=True)
         
         if found_payment:
             payment_text = '\n• '.join(found_payment[:5])
@@ -434,12 +470,8 @@ def generate_document_based_response(query, document_text):
         date_pattern = r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]* \d{1,2},? \d{4}\b)'
         dates = re.findall(date_pattern, document_text, re.IGNORECASE)
         
-        timeline_terms = ['deadline', 'timeline', 'schedule', 'by', 'until', 'from', 'to']
-        found_timelines = []
-        
-        for sentence in document_text.split('.'):
-            if any(term in sentence.lower() for term in timeline_terms):
-                found_timelines.append(sentence.strip())
+        timeline_terms = ['deadline', 'timeline', 'schedule', 'until', 'days', 'date', 'term']
+        found_timelines = sentence_index.top_sentences(' '.join(timeline_terms), k=3, document_order=True)
         
         response_parts = []
         if dates:
@@ -453,16 +485,11 @@ def generate_document_based_response(query, document_text):
             return "🤔 No specific dates or timelines were found in the document text."
     
     else:
-        # Generic response with document snippet
-        words = query.lower().split()
-        relevant_sentences = []
-        
-        for sentence in document_text.split('.'):
-            if any(word in sentence.lower() for word in words if len(word) > 3):
-                relevant_sentences.append(sentence.strip())
+        # Generic response with the best BM25 matches for the query
+        relevant_sentences = sentence_index.top_sentences(query, k=3)
         
         if relevant_sentences:
-            relevant_text = '\n• '.join(relevant_sentences[:3])
+            relevant_text = '\n• '.join(relevant_sentences)
             return f"🔍 **Relevant Content Found:**\n\n• {relevant_text}\n\n*This is based on keyword matching in the document.*"
         else:
             # Return a portion of the document as general context
@@ -4,6 +4,7 @@ import base64
 from PIL import Image
 from db import get_all_documents, get_glossary_terms
 from preprocess import extract_text_from_upload
+from processing import open_document
 # Note: You'll need to pass 'process_document_logic' into this function
 # since it's defined in app.py
 
@@ -170,8 +171,16 @@ def show_page(tenant_db, tenant_user_id, process_document_logic_func):
                         col1_hist, col2_hist = st.columns([3, 1])
                         with col1_hist: 
                             st.markdown(f"**{title}**")
-                        with col2_hist: 
                             st.caption(f"{date_str.split(' ')[0] if date_str else ''}")
+                        with col2_hist: 
+                            if st.button("Open", key=f"open_doc_{doc['id']}", help="Reopen this document"):
+                                try:
+                                    with st.spinner("Opening document..."):
+                                        open_document(tenant_db, tenant_user_id, doc['id'])
+                                    st.session_state.active_workspace_tab = "Legal Assistant"
+                                    st.rerun()
+                                except Exception as e:
+                                    st.error(f"Failed to open document: {e}")
                         st.markdown('</div>', unsafe_allow_html=True)
             
             else:
@@ -181,4 +190,27 @@ def show_page(tenant_db, tenant_user_id, process_document_logic_func):
                     st.info("No documents processed yet.")
 
         except Exception as e: 
-            st.error(f"History load error: {e}")
\ No newline at end of file
+            st.error(f"History load error: {e}")
+
+        st.markdown("---")
+        st.markdown("**Search All Documents**")
+        corpus_query = st.text_input(
+            "Search across documents...",
+            placeholder="e.g. uncapped indemnity",
+            label_visibility="collapsed",
+            key="tenant_search"
+        )
+        if corpus_query:
+            try:
+                import tenant_index
+                with st.spinner("Searching your documents..."):
+                    hits = tenant_index.search(tenant_db, corpus_query, k=5)
+                if not hits:
+                    st.info("No matching passages found.")
+                else:
+                    titles = {d['id']: d.get('document_title') or 'Untitled' for d in get_all_documents(tenant_db).to_dict('records')}
+                    for hit in hits:
+                        st.markdown(f"**{titles.get(hit['document_id'], 'Untitled')}** · chars {hit['start_offset']}-{hit['end_offset']}")
+                        st.caption(hit['text'][:300] + ("..." if len(hit['text']) > 300 else ""))
+            except Exception as e:
+                st.error(f"Search failed: {e}")
\ No newline at end of file
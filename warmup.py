@@ -0,0 +1,116 @@
+# warmup.py
+# Background warm-up: preloads models in priority order when the server starts and reports their readiness.
+
+import os
+import time
+import threading
+
+from model_registry import REGISTRY
+
+# Loaded in this order; simplification choices plus "embed" for the MiniLM embeddings. Empty = no warm-up.
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "FLAN-T5,DistilBART,embed").split(",") if m.strip()]
+
+# Everything the status panel reports on, warm-up targets or not
+KNOWN_MODELS = ["DistilBART", "BART-Large", "FLAN-T5", "embed"]
+MODEL_LABELS = {"embed": "MiniLM embeddings"}
+
+_THREAD = None
+_START_LOCK = threading.Lock()
+_WARMUP = {"started_at": None, "finished_at": None, "pending": [], "current": None, "errors": {}}
+
+
+def _registry_key(name: str) -> str:
+    import models
+    if name == "embed":
+        return models.EMBEDDING_KEY
+    return models.checkpoint_key(models.SIMPLIFY_MODELS[name][0])
+
+
+def _load(name: str):
+    import models
+    if name == "embed":
+        models.get_embedding_model()
+        return
+    # FLAN-T5 weights are shared with the RAG generator, so this warms both
+    pipe = models.get_simplify_pipeline(name)
+    if isinstance(pipe, str):
+        raise RuntimeError(pipe)
+
+
+def _run(names):
+    _WARMUP["started_at"] = time.time()
+    for name in names:
+        _WARMUP["pending"].remove(name)
+        _WARMUP["current"] = name
+        start = time.time()
+        try:
+            _load(name)
+            print(f"🔥 Warmed up {name} in {time.time() - start:.1f}s")
+        except Exception as e:
+            _WARMUP["errors"][name] = str(e)
+            print(f"⚠️ Warm-up of {name} failed: {e}")
+    _WARMUP["current"] = None
+    _WARMUP["finished_at"] = time.time()
+
+
+def start_warmup(names=None) -> bool:
+    """
+    Start the warm-up thread once per process (Streamlit reruns call this on every interaction).
+    A request for a model that is still warming joins the same load through the registry.
+    """
+    global _THREAD
+    from model_server import MODEL_SERVER_URL
+    if MODEL_SERVER_URL:
+        return False  # The model server warms its own models
+    names = [n for n in (names or WARMUP_MODELS) if n in KNOWN_MODELS]
+    with _START_LOCK:
+        if _THREAD is not None or not names:
+            return False
+        _WARMUP["pending"] = list(names)
+        _THREAD = threading.Thread(target=_run, args=(names,), name="model-warmup", daemon=True)
+        _THREAD.start()
+    print(f"🔥 Warming up: {', '.join(names)}")
+    return True
+
+
+def model_status() -> list:
+    """One row per known model: {name, label, state, stage, ...} from the registry."""
+    rows = []
+    for name in KNOWN_MODELS:
+        try:
+            status = REGISTRY.status(_registry_key(name))
+        except Exception as e:
+            status = {"state": "unavailable", "progress": 0.0, "stage": str(e)}
+        if status["state"] == "not_loaded" and name in _WARMUP["pending"]:
+            status = dict(status, state="queued", stage="queued")
+        elif status["state"] == "not_loaded" and name in _WARMUP["errors"]:
+            status = dict(status, state="failed", stage="failed", error=_WARMUP["errors"][name])
+        rows.append(dict(status, name=name, label=MODEL_LABELS.get(name, name)))
+    return rows
+
+
+def warmup_summary() -> dict:
+    """Overall warm-up progress for the admin panel."""
+    return {
+        "targets": list(WARMUP_MODELS),
+        "current": _WARMUP["current"],
+        "pending": list(_WARMUP["pending"]),
+        "errors": dict(_WARMUP["errors"]),
+        "started_at": _WARMUP["started_at"],
+        "finished_at": _WARMUP["finished_at"],
+        "running": _THREAD is not None and _THREAD.is_alive(),
+    }
+
+
+def format_status(row: dict) -> str:
+    """
+    Short human-readable readiness line, e.g. 'BART-Large loading (weights, 12s)'. Loaders only
+    report which stage they are in (weights load in one call), so no percentage is shown.
+    """
+    if row["state"] == "loading":
+        return f"{row['label']} loading ({row['stage']}, {row.get('elapsed_seconds', 0):.0f}s)"
+    if row["state"] == "ready":
+        return f"{row['label']} ready"
+    if row["state"] == "failed":
+        return f"{row['label']} failed"
+    return f"{row['label']} {row['state'].replace('_', ' ')}"